@@ -1,10 +1,43 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from .config import Config
+from .controllers.accuracy_controller import init_evaluation_worker
 from .routes import router as api_routes
+from .services.data_store import DataStore
+from .utils.cpu_pool import CpuPool
+from .utils.process_pool import ProcessPool
+from .utils import profiling
+from .utils.metrics import REQUEST_SECONDS
+
+
+def create_app(store: DataStore | None = None):
+    # Dados carregados uma única vez e compartilhados entre as requisições
+    if store is None:
+        store = DataStore.load()
+        store.warm_up()
+    cpu_pool = CpuPool(Config.CPU_WORKERS)
+    # Processos de /accuracy; o catálogo (fixo) vai uma vez para cada um
+    accuracy_pool = (
+        ProcessPool(Config.ACCURACY_WORKERS, init_evaluation_worker, (store.catalog(),))
+        if Config.ACCURACY_WORKERS > 1
+        else None
+    )
 
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        store.start_compaction()
+        store.start_index_merge()
+        store.start_genre_weights_flush()
+        yield
+        cpu_pool.shutdown()
+        if accuracy_pool is not None:
+            accuracy_pool.shutdown()
+        store.close()
 
-def create_app():
-    app = FastAPI(title="Music Recommender (Pearson)")
+    app = FastAPI(title="Music Recommender (Pearson)", lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -13,5 +46,38 @@ def create_app():
         allow_headers=["*"],
     )
 
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        # Rota como template (/recomendar), não o caminho com parâmetros
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=response.status_code,
+        )
+        return response
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        # Só a requisição marcada é perfilada (no CpuPool e no threadpool);
+        # as demais não.
+        # O token vem só em header, para não ficar em URLs e logs de acesso.
+        if not profiling.allowed(request.headers.get("X-Profile-Token")):
+            return await call_next(request)
+        profile_id = profiling.request_profile(
+            request.url.path, memory=request.headers.get("X-Profile-Memory") == "1"
+        )
+        response = await call_next(request)
+        if profiling.PROFILES.get(profile_id) is not None:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    app.state.store = store
+    app.state.cpu_pool = cpu_pool
+    app.state.accuracy_pool = accuracy_pool
+
     app.include_router(api_routes)
     return app
@@ -4,5 +4,68 @@ import os
 class Config:
     DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     ITEMS_FILE = os.path.join(DATA_DIR, "new_items.csv")
+    CATALOG_DIR = os.path.join(DATA_DIR, "new_items.catalog")
     RATINGS_FILE = os.path.join(DATA_DIR, "new_ratings_dense.csv")
+    RATINGS_LOG_FILE = os.path.join(DATA_DIR, "new_ratings_dense.log")
     GENRE_WEIGHTS_FILE = os.path.join(DATA_DIR, "genre_weights.json")
+
+    # Compactação do log de ratings no snapshot base (new_ratings_dense.csv)
+    COMPACT_INTERVAL_SECONDS = float(os.getenv("COMPACT_INTERVAL_SECONDS", "60"))
+    COMPACT_MIN_ROWS = int(os.getenv("COMPACT_MIN_ROWS", "1000"))
+
+    # Gravação em lote (write-behind) dos pesos de gênero por usuário
+    GENRE_WEIGHTS_FLUSH_SECONDS = float(os.getenv("GENRE_WEIGHTS_FLUSH_SECONDS", "5"))
+
+    # Merge dos ratings novos na matriz do índice, em segundo plano: a cada
+    # intervalo ou assim que o delta passa de INDEX_MERGE_MIN_ROWS notas
+    INDEX_MERGE_SECONDS = float(os.getenv("INDEX_MERGE_SECONDS", "10"))
+    INDEX_MERGE_MIN_ROWS = int(os.getenv("INDEX_MERGE_MIN_ROWS", "10000"))
+
+    # Grafo de vizinhos (top-k usuários mais similares); k <= 0 usa todos
+    NEIGHBORS_K = int(os.getenv("NEIGHBORS_K", "50"))
+    NEIGHBOR_BLOCK_BYTES = int(os.getenv("NEIGHBOR_BLOCK_BYTES", str(256 * 2**20)))
+    NEIGHBORS_FILE = os.path.join(DATA_DIR, "neighbors_{metric}.npz")
+    # Fração de listas possivelmente desatualizadas (um vizinho saiu de uma
+    # lista cheia) que dispara a reconstrução do grafo em segundo plano
+    NEIGHBORS_REBUILD_FRACTION = float(os.getenv("NEIGHBORS_REBUILD_FRACTION", "0.01"))
+
+    # Tabela item-item truncada (top-k itens similares por item)
+    ITEM_NEIGHBORS_K = int(os.getenv("ITEM_NEIGHBORS_K", "50"))
+    ITEM_SIMILARITY_FILE = os.path.join(DATA_DIR, "item_similarity_{metric}.npz")
+    ITEM_SIMILARITY_REBUILD_FRACTION = float(
+        os.getenv("ITEM_SIMILARITY_REBUILD_FRACTION", "0.1")
+    )
+
+    # Cache LRU de similaridades (cada entrada = um usuário contra todos)
+    SIM_CACHE_MAX_ENTRIES = int(os.getenv("SIM_CACHE_MAX_ENTRIES", "256"))
+
+    # Pools de candidatos por gênero (cold-start, surpresa, usuário simulado):
+    # itens por faixa, peso da média global na nota de qualidade e
+    # crescimento de ratings que dispara a reconstrução
+    GENRE_POOL_SIZE = int(os.getenv("GENRE_POOL_SIZE", "50"))
+    GENRE_POOL_PRIOR = float(os.getenv("GENRE_POOL_PRIOR", "10"))
+    GENRE_POOL_REBUILD_FRACTION = float(os.getenv("GENRE_POOL_REBUILD_FRACTION", "0.1"))
+
+    # Cache de respostas de /recomendar (LRU + TTL, invalidado por versão)
+    RECOMMEND_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMEND_CACHE_MAX_ENTRIES", "10000"))
+    RECOMMEND_CACHE_TTL_SECONDS = float(os.getenv("RECOMMEND_CACHE_TTL_SECONDS", "30"))
+
+    # Máximo de usuários em um POST /recomendar/batch
+    BATCH_RECOMMEND_MAX_USERS = int(os.getenv("BATCH_RECOMMEND_MAX_USERS", "500"))
+
+    # Pool limitado para recomendação/avaliação (rotas async delegam a ele)
+    CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # Processos (forkserver/spawn) que avaliam os usuários de /accuracy sobre
+    # a matriz em memória compartilhada; <= 1 avalia no CpuPool
+    ACCURACY_WORKERS = int(
+        os.getenv("ACCURACY_WORKERS", str(min(4, os.cpu_count() or 1)))
+    )
+
+    # Profiling sob demanda (cProfile) de uma requisição com o header
+    # X-Profile-Token; sem token fica desligado. tracemalloc (global ao
+    # processo) só com X-Profile-Memory: 1 também
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "20"))
+    PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+    PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
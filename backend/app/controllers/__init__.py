@@ -1,5 +1,7 @@
 from .accuracy_controller import AccuracyController
+from .batch_recommendation_controller import BatchRecommendationController
 from .feedback_controller import FeedbackController
+from .metrics_controller import MetricsController
 from .query_controller import QueryController
 from .recommendation_controller import RecommendationController
 from .user_simulation_controller import UserSimulationController
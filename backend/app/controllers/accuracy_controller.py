@@ -1,20 +1,97 @@
+import math
+
+from app.config import Config
+from app.services.catalog_index import CatalogIndex
+from app.services.data_store import DataStore
+from app.services.genre_pools import GenrePools
+from app.services.rating_index import RatingIndex
+from app.services.rating_matrix import RatingMatrix
 from app.services.recommendation_service import RecommendationService
-from app.utils import load_ratings, load_genre_weights, load_items
+from app.utils import profiling
+from app.utils.shared_arrays import SharedArrays, attach
 import numpy as np
 
-TOTAL_ITEMS = 9564
+# Estado de um processo do pool de avaliação: o catálogo (recebido uma vez,
+# na criação do processo) e a última matriz anexada da memória compartilhada
+_worker: dict = {}
+
+
+def init_evaluation_worker(catalog: CatalogIndex) -> None:
+    _worker["catalog"] = catalog
+
+
+def evaluate_shared(task: dict) -> list[dict]:
+    """Avalia um bloco de usuários em um processo do pool, sobre a matriz do
+    snapshot anexada da memória compartilhada (sem cópia)."""
+    name = task["matrix"][0]
+    if _worker.get("name") != name:
+        _worker.pop("matrix", None)
+        if "shm" in _worker:
+            _worker.pop("shm").close()
+        shm, parts = attach(task["matrix"])
+        _worker.update(name=name, shm=shm, matrix=RatingMatrix.from_parts(parts))
+    catalog = _worker["catalog"]
+    controller = AccuracyController(
+        task["metric"],
+        RatingIndex(_worker["matrix"], stats=task["stats"]),
+        catalog,
+        GenrePools(catalog, task["tiers"], task["n_ratings"]),
+        task["genre_weights"],
+        task["default_genre_weights"],
+        k=task["k"],
+    )
+    return controller.evaluate_users(
+        task["users"], task["n_recommend"], task["test_frac"], task["seed"]
+    )
 
 
 class AccuracyController:
-    def __init__(self, metric):
-        self.recommendation_service = RecommendationService(metric)
-        self.ratings = load_ratings()
-        self.gw = load_genre_weights()
-        self.items = load_items()
-
-    def __compute_accuracy(self, user_id, n_recommend, test_frac):
-        user_r = self.ratings[self.ratings.user_id == user_id]
-        liked = user_r[user_r.rating >= 4]
+    """Acurácia leave-out sobre um snapshot do índice.
+
+    Vários usuários são avaliados em blocos (``chunks``). Com o pool de
+    processos, cada bloco roda em um processo (``evaluate_shared``) que
+    anexa a matriz do snapshot exportada uma vez para memória compartilhada
+    (``share``); sem ele, ou com profiling, os blocos rodam no ``CpuPool``
+    (``evaluate_users``). O resultado de cada usuário depende só da seed,
+    não do bloco nem do processo em que caiu."""
+
+    def __init__(
+        self,
+        metric,
+        index: RatingIndex,
+        catalog: CatalogIndex,
+        genre_pools: GenrePools,
+        genre_weights: dict[int, dict[str, float]],
+        default_genre_weights: dict[str, float],
+        k: int | None = None,
+    ):
+        self.metric = metric
+        self.recommendation_service = RecommendationService(metric, k)
+        self.index = index
+        self.catalog = catalog
+        self.genre_pools = genre_pools
+        self.genre_weights = genre_weights
+        self.default_genre_weights = default_genre_weights
+
+    @classmethod
+    def from_store(cls, store: DataStore, metric) -> "AccuracyController":
+        # Snapshot imutável do índice: a avaliação não vê escritas concorrentes
+        # e cada usuário é avaliado mascarando suas notas de teste
+        return cls(
+            metric,
+            store.index().snapshot(),
+            store.catalog(),
+            store.genre_pools(),
+            store.genre_weights_by_user(),
+            store.default_genre_weights(),
+        )
+
+    def _compute_accuracy(self, user_id, n_recommend, test_frac, seed):
+        # Semente por usuário: o resultado não depende da ordem nem do bloco
+        rng = np.random.default_rng([seed, user_id])
+
+        item_ids, values = self.index.user_ratings(user_id)
+        liked = item_ids[values >= 4]
         if len(liked) < 1:
             return {
                 "user_id": user_id,
@@ -22,25 +99,28 @@ class AccuracyController:
                 "reason": "poucos itens curtidos para teste",
             }
 
-        test = liked.sample(max(1, int(len(liked) * test_frac)))
-        train = self.ratings.drop(test.index)
+        test = rng.choice(
+            liked, size=max(1, int(len(liked) * test_frac)), replace=False
+        )
+        train = self.index.masked(user_id, test)
 
         n_chances = max(n_recommend, 100)
 
         recs_full = self.recommendation_service.recommend_items(
             user_id,
             n=n_chances,
-            ratings_df=train,
-            items_df=self.items,
-            genre_weights=self.gw,
-            max_items_to_check=TOTAL_ITEMS,
+            index=train,
+            catalog=self.catalog,
+            genre_weights=self.genre_weights.get(user_id, self.default_genre_weights),
+            genre_pools=self.genre_pools,
+            random_state=int(rng.integers(10000)),
         )
 
         recs = recs_full[:n_recommend]
 
         rec_ids = set([r["item_id"] for r in recs])
 
-        hits = sum(1 for iid in test.item_id if iid in rec_ids)
+        hits = sum(1 for iid in test.tolist() if iid in rec_ids)
 
         acc = hits / len(recs) if len(recs) > 0 else 0.0
 
@@ -51,31 +131,72 @@ class AccuracyController:
             "accuracy": acc,
         }
 
-    def get_accuracy(
-        self, user_id: int, n_recommend: int, test_frac: float, max_users: int
-    ) -> dict:
-        if user_id is not None:
-            return self.__compute_accuracy(
-                user_id=user_id, n_recommend=n_recommend, test_frac=test_frac
-            )
-        else:
-            users = self.ratings.user_id.unique().tolist()
-
-            # escolher apenas até max_users usuários (aleatórios)
-            if len(users) > max_users:
-                users = list(np.random.choice(users, size=max_users, replace=False))
-
-            accs = []
-            for u in users:
-                res = self.__compute_accuracy(
-                    user_id=int(u), n_recommend=n_recommend, test_frac=test_frac
-                )
-                if res.get("accuracy") is not None:
-                    accs.append(res["accuracy"])
-
-            mean_acc = float(np.mean(accs)) if accs else None
-            return {
-                "mean_accuracy": mean_acc,
-                "n_users_evaluated": len(accs),
-                "max_users": max_users,
-            }
+    def evaluate_users(self, users, n_recommend, test_frac, seed) -> list[dict]:
+        return [
+            self._compute_accuracy(int(u), n_recommend, test_frac, seed) for u in users
+        ]
+
+    def share(self) -> SharedArrays:
+        """Exporta a matriz do snapshot para memória compartilhada (uma cópia
+        por avaliação, lida sem cópia por todos os processos)."""
+        return SharedArrays(self.index.matrix().parts())
+
+    def task(self, shared: SharedArrays, users, n_recommend, test_frac, seed) -> dict:
+        """Tarefa de ``evaluate_shared`` para um bloco de usuários: só a
+        referência à matriz e o que é pequeno (pools, pesos do bloco)."""
+        index, k = self.index, self.recommendation_service.k
+        return {
+            "matrix": shared.spec,
+            "stats": (index.n_ratings, index.fingerprint()[1], index.max_user_id()),
+            "metric": self.metric,
+            "k": k if k is not None else Config.NEIGHBORS_K,
+            "tiers": self.genre_pools.tiers,
+            "n_ratings": self.genre_pools.n_ratings,
+            "genre_weights": {
+                int(u): self.genre_weights[int(u)]
+                for u in users
+                if int(u) in self.genre_weights
+            },
+            "default_genre_weights": self.default_genre_weights,
+            "users": [int(u) for u in users],
+            "n_recommend": n_recommend,
+            "test_frac": test_frac,
+            "seed": seed,
+        }
+
+    def get_user_accuracy(self, user_id, n_recommend, test_frac, seed) -> dict:
+        result = self._compute_accuracy(
+            user_id=user_id, n_recommend=n_recommend, test_frac=test_frac, seed=seed
+        )
+        return {**result, "seed": seed}
+
+    def sample_users(self, max_users: int, seed) -> list[int]:
+        users = self.index.user_ids()
+
+        # escolher apenas até max_users usuários (aleatórios)
+        if len(users) > max_users:
+            rng = np.random.default_rng(seed)
+            users = rng.choice(users, size=max_users, replace=False).tolist()
+        return users
+
+    @staticmethod
+    def chunks(users, n_chunks: int) -> list[list[int]]:
+        """Usuários divididos em até ``n_chunks`` blocos. Com profiling
+        ativo é um bloco só, para que o perfil mostre o trabalho real."""
+        if not users:
+            return []
+        n_chunks = 1 if profiling.active() else min(n_chunks, len(users))
+        return [users[i::n_chunks] for i in range(n_chunks)]
+
+    @staticmethod
+    def summary(results: list[dict], max_users: int, seed) -> dict:
+        accs = [r["accuracy"] for r in results if r.get("accuracy") is not None]
+
+        # Soma exata: a média não depende da ordem dos blocos
+        mean_acc = math.fsum(accs) / len(accs) if accs else None
+        return {
+            "mean_accuracy": mean_acc,
+            "n_users_evaluated": len(accs),
+            "max_users": max_users,
+            "seed": seed,
+        }
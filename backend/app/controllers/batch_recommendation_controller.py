@@ -0,0 +1,63 @@
+from app.controllers.recommendation_controller import RecommendationController
+from app.models.batch_recommend_request import BatchRecommendRequest
+from app.services.data_store import DataStore
+from app.services.prediction_service import METRIC_ALIASES
+from app.utils import profiling
+
+
+class BatchRecommendationController:
+    """Recomendações para vários usuários em uma única chamada.
+
+    Cada usuário passa pelo ``RecommendationController``, ou seja, pelo
+    mesmo cache de respostas de ``/recomendar``: quem já está em cache não é
+    recalculado e o que é calculado aqui fica em cache. Os demais usuários
+    são divididos em blocos, cada bloco calculado em série em um slot do
+    ``CpuPool`` (o lote não usa mais threads que ``CPU_WORKERS``)."""
+
+    def __init__(self, store: DataStore, body: BatchRecommendRequest):
+        self.store = store
+        self.body = body
+        self.controllers = {
+            user_id: RecommendationController(
+                store=store,
+                user_id=user_id,
+                n=body.n,
+                metric=body.metric,
+                max_items_to_check=body.max_items_to_check,
+            )
+            for user_id in dict.fromkeys(body.user_ids)
+        }
+
+    def cached(self) -> dict[int, list]:
+        """Recomendações já em cache, por usuário (roda no event loop)."""
+        results = {}
+        for user_id, controller in self.controllers.items():
+            result = controller.cached()
+            if result is not None:
+                results[user_id] = result["recommendations"]
+        return results
+
+    def chunks(self, n_chunks: int, done) -> list[list[int]]:
+        """Usuários fora de ``done`` divididos em até ``n_chunks`` blocos.
+        Com profiling ativo é um bloco só, para que o perfil veja o lote."""
+        missing = [user_id for user_id in self.controllers if user_id not in done]
+        if not missing:
+            return []
+        n_chunks = 1 if profiling.active() else min(n_chunks, len(missing))
+        return [missing[i::n_chunks] for i in range(n_chunks)]
+
+    def recommend_users(self, user_ids) -> dict[int, list]:
+        """Calcula (e guarda em cache) as recomendações de ``user_ids``."""
+        return {
+            user_id: self.controllers[user_id].recommend()["recommendations"]
+            for user_id in user_ids
+        }
+
+    def response(self, results: dict[int, list]) -> dict:
+        return {
+            "metric": METRIC_ALIASES.get(self.body.metric, self.body.metric),
+            "n": self.body.n,
+            "recommendations": {
+                user_id: results[user_id] for user_id in self.controllers
+            },
+        }
@@ -1,47 +1,62 @@
 from app.models.feedback import Feedback
-from app.utils import (
-    load_genre_weights,
-    load_items,
-    load_ratings,
-    save_ratings,
-    save_genre_weights,
-)
-import pandas as pd
+from app.models.feedback_batch import FeedbackBatch
+from app.services.data_store import DataStore
 
 
 class FeedbackController:
+    def __init__(self, store: DataStore):
+        self.store = store
+
     def handle_feedback(self, fb: Feedback):
-        ratings = load_ratings()
-        new_row = {
-            "user_id": int(fb.user_id),
-            "item_id": int(fb.item_id),
-            "rating": int(fb.rating),
-        }
-        ratings = pd.concat([ratings, pd.DataFrame([new_row])], ignore_index=True)
-        save_ratings(ratings)
-
-        # Atualizar pesos de gênero (incremental + decay)
-        items = load_items()
-        item_row = items[items.id == fb.item_id]
-
-        if not item_row.empty:
-            genre = str(item_row.iloc[0].genre)
-            gw = load_genre_weights()
-
-            # positiva (4–5) aumenta peso
-            if fb.rating >= 4:
-                delta = (fb.rating - 3) * 0.02
-                gw[genre] = gw.get(genre, 0.0) * 0.9 + delta
-
-            # negativa (1–2) reduz peso
-            elif fb.rating <= 2:
-                delta = (3 - fb.rating) * 0.02
-                gw[genre] = gw.get(genre, 0.0) * 0.9 - delta
-
-            # limitar intervalo [0,1]
-            if gw[genre] < 0.0:
-                gw[genre] = 0.0
-            if gw[genre] > 1.0:
-                gw[genre] = 1.0
-
-            save_genre_weights(gw)
+        self.handle_feedback_batch(FeedbackBatch(feedbacks=[fb]))
+
+    def handle_feedback_batch(self, batch: FeedbackBatch):
+        """Aplica todos os ratings do lote de uma vez: um único group commit
+        no log e uma única passada nos pesos de gênero de cada usuário."""
+        new_rows = [
+            {
+                "user_id": int(fb.user_id),
+                "item_id": int(fb.item_id),
+                "rating": int(fb.rating),
+            }
+            for fb in batch.feedbacks
+        ]
+        self.store.add_ratings(new_rows)
+
+        # Atualizar pesos de gênero do usuário (incremental + decay), na
+        # ordem do lote; só os usuários do lote são tocados
+        genres = self.store.catalog().genre_of([row["item_id"] for row in new_rows])
+
+        weights_of = {}
+        for row, genre in zip(new_rows, genres):
+            if genre is None:
+                continue
+            user_id = row["user_id"]
+            if user_id not in weights_of:
+                weights_of[user_id] = self.store.genre_weights(user_id)
+            self.__update_genre_weight(weights_of[user_id], genre, row["rating"])
+        for user_id, gw in weights_of.items():
+            self.store.set_genre_weights(user_id, gw)
+        return {"status": "ok", "count": len(new_rows)}
+
+    @staticmethod
+    def __update_genre_weight(gw: dict, genre: str, rating: int) -> None:
+        # positiva (4–5) aumenta peso
+        if rating >= 4:
+            delta = (rating - 3) * 0.02
+            gw[genre] = gw.get(genre, 0.0) * 0.9 + delta
+
+        # negativa (1–2) reduz peso
+        elif rating <= 2:
+            delta = (3 - rating) * 0.02
+            gw[genre] = gw.get(genre, 0.0) * 0.9 - delta
+
+        # neutra (3) não altera
+        else:
+            return
+
+        # limitar intervalo [0,1]
+        if gw[genre] < 0.0:
+            gw[genre] = 0.0
+        if gw[genre] > 1.0:
+            gw[genre] = 1.0
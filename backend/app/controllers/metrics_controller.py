@@ -0,0 +1,22 @@
+from app.services.data_store import DataStore
+from app.utils.metrics import (
+    DATASTORE_SIZE,
+    RECOMMEND_CACHE,
+    REGISTRY,
+    SIMILARITY_CACHE,
+)
+
+
+class MetricsController:
+    def __init__(self, store: DataStore):
+        self.store = store
+
+    def render(self) -> str:
+        """Atualiza os gauges lidos do DataStore e exporta todas as métricas."""
+        for kind, value in self.store.sizes().items():
+            DATASTORE_SIZE.set(value, kind=kind)
+        for stat, value in self.store.similarity_cache().stats().items():
+            SIMILARITY_CACHE.set(value, stat=stat)
+        for stat, value in self.store.recommendation_cache().stats().items():
+            RECOMMEND_CACHE.set(value, stat=stat)
+        return REGISTRY.render()
@@ -1,12 +1,12 @@
-from app.utils.items import load_items
-from app.utils.rattings import load_ratings
+from app.services.data_store import DataStore
 
 
 class QueryController:
+    def __init__(self, store: DataStore):
+        self.store = store
+
     def get_all_genres(self):
-        items = load_items()
-        return sorted(items.genre.dropna().unique().tolist())
+        return self.store.genres()
 
     def get_all_users_ids(self):
-        ratings = load_ratings()
-        return sorted(ratings.user_id.unique().tolist())
+        return self.store.user_ids()
@@ -1,24 +1,63 @@
+from app.services.data_store import DataStore
+from app.services.prediction_service import METRIC_ALIASES
 from app.services.recommendation_service import RecommendationService
-from app.utils import load_items, load_ratings, load_genre_weights
+from app.utils import profiling
+from app.utils.metrics import RECOMMEND_CACHE_TOTAL
 
 
 class RecommendationController:
-    def __init__(self, user_id: int, n: int, metric):
+    def __init__(
+        self,
+        store: DataStore,
+        user_id: int,
+        n: int,
+        metric,
+        max_items_to_check: int | None = None,
+    ):
+        self.store = store
         self.user_id = user_id
         self.n = n
         self.metric = metric
-        self.recommendation_service = RecommendationService(self.metric)
+        self.max_items_to_check = max_items_to_check
+        self.recommendation_service = RecommendationService(
+            self.metric, sim_cache=store.similarity_cache()
+        )
+        self.cache_key = (
+            int(user_id),
+            n,
+            METRIC_ALIASES.get(metric, metric),
+            max_items_to_check,
+        )
+        self.cache_status = "MISS"
+
+    def cached(self) -> dict | None:
+        """Resposta em cache, se ainda válida; barata o bastante para rodar
+        no event loop. Requisições com profiling ignoram o cache."""
+        if profiling.active():
+            self.cache_status = "BYPASS"
+        else:
+            result = self.store.recommendation_cache().get(
+                self.cache_key, self.store.data_versions(self.user_id)
+            )
+            self.cache_status = "HIT" if result is not None else "MISS"
+        RECOMMEND_CACHE_TOTAL.inc(result=self.cache_status.lower())
+        return result if self.cache_status == "HIT" else None
 
     def recommend(self):
-        items = load_items()
-        ratings = load_ratings()
-        gw = load_genre_weights()
+        # Versões lidas antes do cálculo: uma escrita concorrente invalida
+        # a entrada em vez de ficar mascarada por ela
+        versions = self.store.data_versions(self.user_id)
         recs = self.recommendation_service.recommend_items(
             user_id=self.user_id,
             n=self.n,
-            ratings_df=ratings,
-            items_df=items,
-            genre_weights=gw,
-            max_items_to_check=3000,
+            index=self.store.index(),
+            catalog=self.store.catalog(),
+            genre_weights=self.store.genre_weights(self.user_id),
+            max_items_to_check=self.max_items_to_check,
+            graph=self.store.neighbor_graph(self.metric),
+            item_table=self.store.item_similarity(self.metric),
+            genre_pools=self.store.genre_pools(),
         )
-        return {"user_id": self.user_id, "recommendations": recs}
+        result = {"user_id": self.user_id, "recommendations": recs}
+        self.store.recommendation_cache().put(self.cache_key, versions, result)
+        return result
@@ -1,24 +1,20 @@
+import numpy as np
+
 from app.models.simulate_request import SimulateRequest
-from app.utils import load_items, load_ratings, save_ratings, save_genre_weights
-import pandas as pd
+from app.services.data_store import DataStore
 
 
 class UserSimulationController:
-    def __init__(self):
-        self.items = load_items()
-        self.ratings = load_ratings()
+    def __init__(self, store: DataStore):
+        self.store = store
+        self.genre_pools = store.genre_pools()
 
     def __pick_songs(self, user_id, body, random_state) -> list:
+        rng = np.random.default_rng(random_state)
         rows = []
         for g in body.genres:
-            choices = self.items[self.items.genre == g]
-            if choices.empty:
-                continue
-            sample = choices.sample(min(5, len(choices)), random_state=random_state)
-            for _, row in sample.iterrows():
-                rows.append(
-                    {"user_id": int(user_id), "item_id": int(row.id), "rating": 5}
-                )
+            for item_id in self.genre_pools.sample(g, 5, rng).tolist():
+                rows.append({"user_id": int(user_id), "item_id": item_id, "rating": 5})
         return rows
 
     def get_first_recommendation(
@@ -26,10 +22,7 @@ class UserSimulationController:
     ):
 
         # new user id
-        if self.ratings.empty:
-            new_id = 1
-        else:
-            new_id = int(self.ratings.user_id.max()) + 1
+        new_id = self.store.next_user_id()
 
         # pick até 5 músicas de cada gênero escolhido e dar nota inicial 5
         new_rows = self.__pick_songs(
@@ -37,12 +30,9 @@ class UserSimulationController:
         )
 
         if new_rows:
-            self.ratings = pd.concat(
-                [self.ratings, pd.DataFrame(new_rows)], ignore_index=True
-            )
-            save_ratings(self.ratings)
+            self.store.add_ratings(new_rows)
 
         initial_weights = {g: 0.05 for g in body.genres}
-        save_genre_weights(initial_weights)
+        self.store.set_genre_weights(new_id, initial_weights)
 
         return {"user_id": new_id, "status": "simulated"}
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+from app.config import Config
+
+
+class BatchRecommendRequest(BaseModel):
+    user_ids: list[int] = Field(
+        min_length=1, max_length=Config.BATCH_RECOMMEND_MAX_USERS
+    )
+    n: int = 10
+    metric: str = None
+    max_items_to_check: int = None
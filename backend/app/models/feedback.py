@@ -1,7 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Feedback(BaseModel):
     user_id: int
     item_id: int
-    rating: int
+    rating: int = Field(ge=1, le=5)
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+from app.models.feedback import Feedback
+
+
+class FeedbackBatch(BaseModel):
+    feedbacks: list[Feedback] = Field(min_length=1)
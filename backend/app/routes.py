@@ -1,70 +1,256 @@
+import asyncio
+
+import numpy as np
+
 from .controllers import (
     AccuracyController,
+    BatchRecommendationController,
     UserSimulationController,
     FeedbackController,
+    MetricsController,
     QueryController,
     RecommendationController,
 )
+from .models.batch_recommend_request import BatchRecommendRequest
 from .models.feedback import Feedback
+from .models.feedback_batch import FeedbackBatch
+from .controllers.accuracy_controller import evaluate_shared
 from .models.simulate_request import SimulateRequest
-from fastapi import APIRouter
-
+from .services.data_store import DataStore
+from .utils import profiling
+from .utils.cpu_pool import CpuPool
+from .utils.process_pool import ProcessPool
+from .utils.metrics import CONTENT_TYPE
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter()
 
 
+def get_store(request: Request) -> DataStore:
+    """Retorna o DataStore compartilhado, criado em ``create_app``."""
+    return request.app.state.store
+
+
+def get_cpu_pool(request: Request) -> CpuPool:
+    """Pool de trabalho pesado (recomendação e avaliação)."""
+    return request.app.state.cpu_pool
+
+
+def get_accuracy_pool(request: Request) -> ProcessPool | None:
+    """Pool de processos de /accuracy (None = avaliação no pool de CPU)."""
+    return request.app.state.accuracy_pool
+
+
 @router.get("/genres")
-def get_genres():
+async def get_genres(store: DataStore = Depends(get_store)):
     """Retorna todos os gêneros disponíveis no catálogo."""
-    query_controller = QueryController()
+    query_controller = QueryController(store)
     return query_controller.get_all_genres()
 
 
 @router.get("/users")
-def get_all_user_ids():
-    """Retorna todos os IDs de usuários para o frontend."""
-    query_controller = QueryController()
-    return query_controller.get_all_users_ids()
+async def get_all_user_ids(
+    store: DataStore = Depends(get_store),
+    cpu_pool: CpuPool = Depends(get_cpu_pool),
+):
+    """Retorna todos os IDs de usuários para o frontend.
+
+    A lista é O(usuários) (ids da matriz + usuários ainda no delta do
+    índice), então é montada no pool de CPU, fora do event loop."""
+    query_controller = QueryController(store)
+    return await cpu_pool.run(query_controller.get_all_users_ids)
+
+
+@router.get("/metrics")
+async def get_metrics(store: DataStore = Depends(get_store)):
+    """Métricas do processo no formato texto do Prometheus."""
+    metrics_controller = MetricsController(store)
+    return PlainTextResponse(metrics_controller.render(), media_type=CONTENT_TYPE)
+
+
+def require_profile_token(request: Request) -> None:
+    """Perfis só são lidos com o mesmo token que os habilita."""
+    if not profiling.allowed(request.headers.get("X-Profile-Token")):
+        raise HTTPException(status_code=403, detail="profiling token required")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """Perfis guardados (mais antigos primeiro)."""
+    return profiling.PROFILES.ids()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str):
+    """Perfil de uma requisição: árvore de chamadas (tempos cumulativos) e,
+    se pedido com ``X-Profile-Memory: 1``, top-N de alocações do
+    tracemalloc. O id vem no header ``X-Profile-Id``."""
+    report = profiling.PROFILES.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return report
 
 
 @router.post("/simulate")
-def simulate_user(body: SimulateRequest):
+async def simulate_user(body: SimulateRequest, store: DataStore = Depends(get_store)):
     """Simula um novo usuário (LÓGICA COPIADA DO SEU CÓDIGO ORIGINAL)."""
-    user_simulation_controller = UserSimulationController()
-    return user_simulation_controller.get_first_recommendation(
-        body=body, random_state=42
-    )
+    user_simulation_controller = UserSimulationController(store)
+    try:
+        return await run_in_threadpool(
+            profiling.run,
+            user_simulation_controller.get_first_recommendation,
+            body=body,
+            random_state=42,
+        )
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @router.post("/feedback")
-def feedback(fb: Feedback):
-    """Recebe o rating e atualiza os CSVs de ratings e pesos (LÓGICA COPIADA)."""
-    feedback_controller = FeedbackController()
-    feedback_controller.handle_feedback(fb=fb)
+async def feedback(fb: Feedback, store: DataStore = Depends(get_store)):
+    """Recebe o rating e atualiza os CSVs de ratings e pesos (LÓGICA COPIADA).
+
+    A espera pelo fsync roda no threadpool padrão, fora do pool pesado. Se o
+    log não pôde ser gravado responde 503; reenviar o mesmo rating é seguro."""
+    feedback_controller = FeedbackController(store)
+    try:
+        await run_in_threadpool(
+            profiling.run, feedback_controller.handle_feedback, fb=fb
+        )
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/feedback/batch")
+async def feedback_batch(batch: FeedbackBatch, store: DataStore = Depends(get_store)):
+    """Recebe vários ratings e os aplica de uma vez (um único commit no log e
+    uma única atualização dos pesos de gênero)."""
+    feedback_controller = FeedbackController(store)
+    try:
+        return await run_in_threadpool(
+            profiling.run, feedback_controller.handle_feedback_batch, batch=batch
+        )
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @router.get("/recomendar")
-def recomendar(user_id: int, n: int = 10, metric: str = None):
-    """Gera e retorna a lista de recomendações (Chama o Service)."""
+async def recomendar(
+    user_id: int,
+    response: Response,
+    n: int = 10,
+    metric: str = None,
+    max_items_to_check: int = None,
+    store: DataStore = Depends(get_store),
+    cpu_pool: CpuPool = Depends(get_cpu_pool),
+):
+    """Gera e retorna a lista de recomendações (Chama o Service).
+
+    Por padrão pontua o catálogo inteiro; ``max_items_to_check`` limita o
+    número de candidatos quando a latência importa mais que a exatidão.
+    Respostas repetidas vêm do cache (header ``X-Cache``: HIT, MISS ou
+    BYPASS) enquanto os dados do usuário não mudam."""
     recommendation_controller = RecommendationController(
-        user_id=user_id, n=n, metric=metric
+        store=store,
+        user_id=user_id,
+        n=n,
+        metric=metric,
+        max_items_to_check=max_items_to_check,
     )
-    return recommendation_controller.recommend()
+    result = recommendation_controller.cached()
+    if result is None:
+        result = await cpu_pool.run(recommendation_controller.recommend)
+    response.headers["X-Cache"] = recommendation_controller.cache_status
+    return result
+
+
+@router.post("/recomendar/batch")
+async def recomendar_batch(
+    body: BatchRecommendRequest,
+    store: DataStore = Depends(get_store),
+    cpu_pool: CpuPool = Depends(get_cpu_pool),
+):
+    """Recomendações para vários usuários de uma vez, indexadas por user_id.
+
+    Usa o cache de /recomendar; os usuários fora dele são calculados em
+    blocos no pool de CPU (digests, warmup de cache)."""
+    batch_controller = BatchRecommendationController(store=store, body=body)
+    results = batch_controller.cached()
+    chunks = batch_controller.chunks(cpu_pool.max_workers, done=results)
+    for part in await asyncio.gather(
+        *(cpu_pool.run(batch_controller.recommend_users, chunk) for chunk in chunks)
+    ):
+        results.update(part)
+    return batch_controller.response(results)
 
 
 @router.get("/accuracy")
-def accuracy(
+async def accuracy(
     metric: str = None,
     user_id: int = None,
     n_recommend: int = 10,
     test_frac: float = 0.3,
     max_users: int = 20,
+    seed: int = None,
+    store: DataStore = Depends(get_store),
+    cpu_pool: CpuPool = Depends(get_cpu_pool),
+    accuracy_pool: ProcessPool | None = Depends(get_accuracy_pool),
 ):
-    """Calcula e retorna a' acurácia (média ou por usuário) usando o Service."""
-    accuracy_controller = AccuracyController(metric=metric)
-    return accuracy_controller.get_accuracy(
-        user_id=user_id,
-        n_recommend=n_recommend,
-        test_frac=test_frac,
-        max_users=max_users,
+    """Calcula e retorna a' acurácia (média ou por usuário) usando o Service.
+
+    Os usuários são avaliados em blocos, em processos que leem a matriz do
+    snapshot da memória compartilhada (no pool de CPU se não há pool de
+    processos ou se a requisição pede profiling). Com ``seed`` o resultado
+    é reprodutível (não depende da divisão em blocos)."""
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2**31))
+    accuracy_controller = await cpu_pool.run(
+        AccuracyController.from_store, store=store, metric=metric
     )
+    if user_id is not None:
+        return await cpu_pool.run(
+            accuracy_controller.get_user_accuracy,
+            user_id=user_id,
+            n_recommend=n_recommend,
+            test_frac=test_frac,
+            seed=seed,
+        )
+
+    users = await cpu_pool.run(accuracy_controller.sample_users, max_users, seed)
+    results = []
+    if accuracy_pool is None or profiling.active():
+        parts = await asyncio.gather(
+            *(
+                cpu_pool.run(
+                    accuracy_controller.evaluate_users,
+                    chunk,
+                    n_recommend,
+                    test_frac,
+                    seed,
+                )
+                for chunk in accuracy_controller.chunks(users, cpu_pool.max_workers)
+            )
+        )
+    else:
+        shared = await cpu_pool.run(accuracy_controller.share)
+        try:
+            parts = await asyncio.gather(
+                *(
+                    accuracy_pool.run(
+                        evaluate_shared,
+                        accuracy_controller.task(
+                            shared, chunk, n_recommend, test_frac, seed
+                        ),
+                    )
+                    for chunk in accuracy_controller.chunks(
+                        users, accuracy_pool.max_workers
+                    )
+                )
+            )
+        finally:
+            shared.close()
+    for part in parts:
+        results.extend(part)
+    return accuracy_controller.summary(results, max_users, seed)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+
+def _groups(codes: np.ndarray, n_groups: int) -> list[np.ndarray]:
+    """Linhas de cada código (em ordem de linha), com um único argsort."""
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=n_groups)
+    start = int(np.count_nonzero(codes < 0))  # sem valor (-1) vêm primeiro
+    return np.split(order[start:], np.cumsum(counts)[:-1]) if n_groups else []
+
+
+def _factorize(column: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """Código de cada linha (-1 = vazio) e a tabela de strings, em ordem
+    alfabética como no catálogo binário (``save_catalog``), para que CSV e
+    binário deem os mesmos códigos (e os mesmos sorteios por gênero).
+    Colunas ``Categorical`` já ordenadas reaproveitam os próprios códigos."""
+    if (
+        isinstance(column.dtype, pd.CategoricalDtype)
+        and column.cat.categories.is_monotonic_increasing
+    ):
+        return column.cat.codes.to_numpy(), [str(c) for c in column.cat.categories]
+    codes, uniques = pd.factorize(column.astype(object), sort=True)
+    return codes, [str(u) for u in uniques]
+
+
+def _name(table: list[str], code) -> str:
+    return table[code] if code >= 0 else ""
+
+
+class CatalogIndex:
+    """Índices do catálogo construídos uma vez na carga.
+
+    - id → linha em O(1) (dicionário) e, para vários ids, por busca binária;
+    - título, gênero e artista de cada linha como códigos inteiros sobre
+      tabelas de strings (as do catálogo categórico, sem cópia por linha);
+    - linhas (e ids) de cada gênero e de cada artista, pré-agrupadas.
+
+    Nenhuma consulta filtra o DataFrame do catálogo inteiro."""
+
+    def __init__(self, items: pd.DataFrame):
+        self.items = items
+        self.ids = items.id.to_numpy(dtype=np.int64)
+        self._row_of = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        self._sorted = np.argsort(self.ids, kind="stable")
+
+        self._title_codes, self._titles = _factorize(items.title)
+        self._artist_codes, self._artists = _factorize(items.artist)
+
+        self.genre_codes, self.genre_names = _factorize(items.genre)
+        self._genre_code = {g: c for c, g in enumerate(self.genre_names)}
+        self._genre_rows = _groups(self.genre_codes, len(self.genre_names))
+        self._genre_sizes = np.array([len(r) for r in self._genre_rows], np.int64)
+
+        self._artist_code = {a: c for c, a in enumerate(self._artists)}
+        self._artist_rows = _groups(self._artist_codes, len(self._artists))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Por id ---
+
+    def row(self, item_id) -> int | None:
+        return self._row_of.get(int(item_id))
+
+    def rows(self, item_ids) -> np.ndarray:
+        """Linha de cada id (-1 quando o id não está no catálogo)."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(item_ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.ids, item_ids, sorter=self._sorted)
+        pos = np.minimum(pos, len(self.ids) - 1)
+        rows = self._sorted[pos]
+        return np.where(self.ids[rows] == item_ids, rows, -1)
+
+    def genre_of(self, item_ids) -> list[str | None]:
+        """Gênero de cada id (None se o id ou o gênero não existe)."""
+        rows = self.rows(item_ids)
+        codes = np.where(rows >= 0, self.genre_codes[rows], -1)
+        return [self.genre_names[c] if c >= 0 else None for c in codes.tolist()]
+
+    def record(self, row: int) -> dict:
+        return {
+            "item_id": int(self.ids[row]),
+            "title": _name(self._titles, self._title_codes[row]),
+            "artist": _name(self._artists, self._artist_codes[row]),
+            "genre": self.genre_name(self.genre_codes[row]),
+        }
+
+    # --- Por gênero / artista ---
+
+    def genres(self) -> list[str]:
+        return sorted(self.genre_names)
+
+    def genre_name(self, code) -> str:
+        return _name(self.genre_names, code)
+
+    def genre_code(self, genre) -> int | None:
+        return self._genre_code.get(str(genre))
+
+    def genre_rows(self, genre) -> np.ndarray:
+        code = self.genre_code(genre)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._genre_rows[code]
+
+    def genre_ids(self, genre) -> np.ndarray:
+        return self.ids[self.genre_rows(genre)]
+
+    def artist_ids(self, artist) -> np.ndarray:
+        code = self._artist_code.get(str(artist))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self.ids[self._artist_rows[code]]
+
+    def pick_outside_genres(self, genre_codes, rng, skip=None, attempts=32):
+        """Linha sorteada uniformemente entre os itens fora de ``genre_codes``
+        e não marcados em ``skip`` (máscara por linha); None se não houver.
+
+        Sorteia o gênero pelo tamanho e a linha dentro dele (O(gêneros)),
+        rejeitando linhas marcadas; só depois de ``attempts`` rejeições
+        monta a lista exata de candidatas. Códigos negativos (item sem
+        gênero) são ignorados."""
+        sizes = self._genre_sizes.copy()
+        sizes[[c for c in genre_codes if c >= 0]] = 0
+        total = int(sizes.sum())
+        if total == 0:
+            return None
+        ends = np.cumsum(sizes)
+        for _ in range(attempts):
+            k = int(rng.integers(total))
+            code = int(np.searchsorted(ends, k, side="right"))
+            row = int(self._genre_rows[code][k - (ends[code] - sizes[code])])
+            if skip is None or not skip[row]:
+                return row
+        rows = np.concatenate([self._genre_rows[c] for c in np.flatnonzero(sizes)])
+        if skip is not None:
+            rows = rows[~skip[rows]]
+        return int(rng.choice(rows)) if len(rows) else None
@@ -0,0 +1,484 @@
+import threading
+
+import pandas as pd
+
+from app.config import Config
+from app.services.catalog_index import CatalogIndex
+from app.services.genre_pools import GenrePools
+from app.services.item_similarity import ItemSimilarityTable
+from app.services.neighbor_graph import NeighborGraph
+from app.services.prediction_service import ITEM_METRICS, METRIC_ALIASES, USER_METRICS
+from app.services.rating_index import RatingIndex
+from app.services.recommendation_cache import RecommendationCache
+from app.services.similarity_cache import SimilarityCache
+from app.utils import (
+    load_genre_weights,
+    load_items,
+    load_ratings,
+    logger,
+    save_genre_weights,
+    save_ratings,
+)
+from app.utils.ratings_log import RatingsLog
+from app.utils.rattings import RATINGS_DTYPES
+
+
+class DataStore:
+    """Mantém catálogo, ratings e pesos de gênero em memória durante o processo.
+
+    É construído uma única vez em ``create_app`` e compartilhado por todos os
+    controllers. Escritas atualizam a memória primeiro e depois persistem em
+    disco, de modo que requisições normais nunca passam pelo parser de CSV.
+
+    Novos ratings vão para um log append-only (``RatingsLog``); uma thread de
+    compactação periodicamente incorpora o log ao snapshot base, e outra
+    incorpora o delta do índice à sua matriz (``merge_index``). Tabelas
+    item-item desatualizadas são reconstruídas numa thread própria enquanto
+    a anterior continua em uso (``item_similarity``); o mesmo vale para
+    grafos de vizinhos com muitas listas desatualizadas. Os pesos de
+    gênero (por usuário) são gravados em segundo plano (write-behind), em
+    lote, a cada intervalo e no encerramento."""
+
+    def __init__(
+        self,
+        items: pd.DataFrame,
+        ratings: pd.DataFrame,
+        genre_weights: dict[int, dict[str, float]],
+        ratings_log: RatingsLog,
+        default_genre_weights: dict[str, float] | None = None,
+    ):
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._ratings_lock = threading.Lock()
+        self._items = items
+        self._catalog = CatalogIndex(items)
+        self._ratings = ratings
+        self._pending_rows: list[dict] = []
+        # user_id -> pesos; cada dicionário interno é substituído, nunca
+        # alterado, então uma cópia rasa basta como snapshot
+        self._genre_weights = {
+            int(user_id): dict(weights) for user_id, weights in genre_weights.items()
+        }
+        # Pesos de quem não tem pesos próprios (o antigo arquivo global)
+        self._default_genre_weights = dict(default_genre_weights or {})
+        self._genre_weights_dirty = False
+        self._index = RatingIndex.from_ratings(ratings)
+        self._log = ratings_log
+        self._graphs: dict[str, NeighborGraph] = {}
+        self._item_tables: dict[str, ItemSimilarityTable] = {}
+        self._item_rebuilds: dict[str, threading.Thread] = {}
+        # métrica -> usuários que avaliaram algo durante a reconstrução do grafo
+        self._graph_rebuilds: dict[str, set[int]] = {}
+        self._graphs_lock = threading.Lock()
+        self._item_lock = threading.Lock()
+        self._genre_pools = GenrePools.build(self._catalog, self._index.matrix())
+        self._sim_cache = SimilarityCache()
+        self._rec_cache = RecommendationCache()
+        # Versões de dados: global (grafos/tabelas reconstruídos) e por usuário
+        self._data_version = 0
+        self._user_versions: dict[int, int] = {}
+        self._stop = threading.Event()
+        self._merge_wanted = threading.Event()
+        self._merger = None
+        self._compactor = None
+        self._weights_flusher = None
+
+    @classmethod
+    def load(cls) -> "DataStore":
+        """Lê os arquivos de dados uma única vez e reaplica o log de ratings."""
+        ratings_log = RatingsLog(Config.RATINGS_LOG_FILE)
+        genre_weights, default_genre_weights = load_genre_weights()
+        store = cls(
+            items=load_items(),
+            ratings=load_ratings(),
+            genre_weights=genre_weights,
+            ratings_log=ratings_log,
+            default_genre_weights=default_genre_weights,
+        )
+        replayed = ratings_log.replay()
+        if replayed:
+            logger.info(f"ratings log replay rows={len(replayed)}")
+            store._pending_rows.extend(replayed)
+            store._index.add_many(replayed)
+            store._index.merge()
+        return store
+
+    # --- Leitura ---
+
+    def items(self) -> pd.DataFrame:
+        return self._items
+
+    def catalog(self) -> CatalogIndex:
+        """Índices do catálogo (id → linha, gênero/artista → ids)."""
+        return self._catalog
+
+    def genre_pools(self) -> GenrePools:
+        """Pools de candidatos por gênero, reconstruídos quando o número de
+        ratings cresce mais que ``GENRE_POOL_REBUILD_FRACTION``."""
+        with self._graphs_lock:
+            pools = self._genre_pools
+            growth = self._index.n_ratings - pools.n_ratings
+            if growth > pools.n_ratings * Config.GENRE_POOL_REBUILD_FRACTION:
+                pools = GenrePools.build(self._catalog, self._index.matrix())
+                self._genre_pools = pools
+            return pools
+
+    def index(self) -> RatingIndex:
+        """Índices e estatísticas de ratings, atualizados a cada escrita."""
+        return self._index
+
+    def neighbor_graph(self, metric) -> NeighborGraph | None:
+        """Grafo top-k de vizinhos da métrica, construído na primeira consulta
+        e atualizado para os usuários que avaliaram algo desde então. Quando
+        mais que ``NEIGHBORS_REBUILD_FRACTION`` das listas podem ter perdido
+        um vizinho, é reconstruído em segundo plano."""
+        if Config.NEIGHBORS_K <= 0:
+            return None
+        metric = METRIC_ALIASES.get(metric, metric)
+        if metric not in USER_METRICS:
+            return None
+        with self._graphs_lock:
+            graph = self._graphs.get(metric)
+            if graph is None:
+                graph = NeighborGraph.load_or_build(
+                    self._index, metric, Config.NEIGHBORS_K
+                )
+                self._graphs[metric] = graph
+                self.bump_data_version()
+        graph.refresh(self._index.matrix(), self._sim_cache)
+        if graph.n_stale > graph.n_users * Config.NEIGHBORS_REBUILD_FRACTION:
+            self._start_graph_rebuild(metric)
+        return graph
+
+    def _start_graph_rebuild(self, metric: str) -> None:
+        with self._lock:
+            if metric in self._graph_rebuilds:
+                return
+            self._graph_rebuilds[metric] = set()
+        threading.Thread(
+            target=self._rebuild_neighbor_graph,
+            args=(metric,),
+            name=f"neighbor-graph-{metric}",
+            daemon=True,
+        ).start()
+
+    def _rebuild_neighbor_graph(self, metric: str) -> None:
+        """Reconstrói o grafo fora dos locks e troca a referência; quem
+        avaliou algo durante a reconstrução fica marcado no grafo novo."""
+        try:
+            self.merge_index()
+            fingerprint = self._index.fingerprint()
+            graph = NeighborGraph.build(
+                self._index.matrix(), metric, Config.NEIGHBORS_K
+            )
+            graph.fingerprint = fingerprint
+        except Exception as e:
+            logger.error(f"neighbor graph rebuild failed metric={metric}: {e}")
+            graph = None
+        with self._graphs_lock:
+            with self._lock:
+                changed = self._graph_rebuilds.pop(metric)
+                if graph is not None:
+                    graph.mark_dirty(changed)
+                    self._graphs[metric] = graph
+        if graph is not None:
+            self.bump_data_version()
+
+    def item_similarity(self, metric) -> ItemSimilarityTable | None:
+        """Tabela item-item da métrica (gerada offline ou na primeira consulta).
+
+        Similaridades entre itens mudam devagar, então a tabela não é
+        atualizada a cada feedback; quando o número de ratings cresce mais
+        que ``ITEM_SIMILARITY_REBUILD_FRACTION`` ela é reconstruída em
+        segundo plano e, até a nova ficar pronta, a atual segue em uso."""
+        metric = METRIC_ALIASES.get(metric, metric)
+        if metric not in ITEM_METRICS:
+            return None
+        with self._item_lock:
+            table = self._item_tables.get(metric)
+            if table is None:
+                table = ItemSimilarityTable.load_or_build(self._index, metric)
+                self._item_tables[metric] = table
+                self.bump_data_version()
+                return table
+            built_with = table.fingerprint[0] if table.fingerprint else 0
+            growth = self._index.n_ratings - built_with
+            if (
+                growth > built_with * Config.ITEM_SIMILARITY_REBUILD_FRACTION
+                and metric not in self._item_rebuilds
+            ):
+                thread = threading.Thread(
+                    target=self._rebuild_item_similarity,
+                    args=(metric,),
+                    name=f"item-similarity-{metric}",
+                    daemon=True,
+                )
+                self._item_rebuilds[metric] = thread
+                thread.start()
+        return table
+
+    def _rebuild_item_similarity(self, metric: str) -> None:
+        """Reconstrói a tabela fora de qualquer lock e troca a referência."""
+        try:
+            table = ItemSimilarityTable.load_or_build(self._index, metric)
+        except Exception as e:
+            logger.error(f"item similarity rebuild failed metric={metric}: {e}")
+            table = None
+        with self._item_lock:
+            if table is not None:
+                self._item_tables[metric] = table
+            del self._item_rebuilds[metric]
+        if table is not None:
+            self.bump_data_version()
+
+    def similarity_cache(self) -> SimilarityCache:
+        return self._sim_cache
+
+    def recommendation_cache(self) -> RecommendationCache:
+        return self._rec_cache
+
+    def data_versions(self, user_id) -> tuple[int, int]:
+        """(versão global, versão do usuário) usadas pelo cache de respostas."""
+        with self._lock:
+            return self._data_version, self._user_versions.get(int(user_id), 0)
+
+    def bump_data_version(self) -> None:
+        """Invalida todas as respostas em cache."""
+        with self._lock:
+            self._data_version += 1
+
+    def warm_up(self) -> None:
+        """Constrói os grafos de vizinhos e as tabelas item-item na inicialização."""
+        for metric in USER_METRICS:
+            self.neighbor_graph(metric)
+        for metric in ITEM_METRICS:
+            self.item_similarity(metric)
+
+    def ratings(self) -> pd.DataFrame:
+        """DataFrame de todos os ratings (base + linhas novas).
+
+        O concat (O(N)) roda fora do lock do store, que só é usado para
+        trocar as referências; materializações concorrentes são serializadas."""
+        with self._ratings_lock:
+            with self._lock:
+                base, pending = self._ratings, self._pending_rows
+                if not pending:
+                    return base
+                self._pending_rows = []
+            try:
+                # Materializa as linhas novas em um único concat amortizado
+                merged = pd.concat(
+                    [base, pd.DataFrame(pending).astype(RATINGS_DTYPES)],
+                    ignore_index=True,
+                )
+            except BaseException:
+                with self._lock:
+                    self._pending_rows = pending + self._pending_rows
+                raise
+            with self._lock:
+                self._ratings = merged
+            return merged
+
+    def genre_weights(self, user_id) -> dict[str, float]:
+        """Pesos de gênero do usuário (os padrão se ele ainda não tem pesos
+        próprios)."""
+        with self._lock:
+            return dict(
+                self._genre_weights.get(int(user_id), self._default_genre_weights)
+            )
+
+    def genre_weights_by_user(self) -> dict[int, dict[str, float]]:
+        """Snapshot de user_id -> pesos (os dicionários internos não mudam).
+        Usuários fora dele usam ``default_genre_weights``."""
+        with self._lock:
+            return dict(self._genre_weights)
+
+    def default_genre_weights(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._default_genre_weights)
+
+    def genres(self) -> list[str]:
+        return self._catalog.genres()
+
+    def user_ids(self) -> list[int]:
+        return self._index.user_ids()
+
+    def next_user_id(self) -> int:
+        return self._index.max_user_id() + 1
+
+    def sizes(self) -> dict[str, int]:
+        """Tamanhos do que está em memória (exportados em ``/metrics``).
+
+        Barato o bastante para o event loop: usuários e ratings vêm dos
+        contadores do índice, lidos fora do lock do store."""
+        users, ratings = self._index.n_users, self._index.n_ratings
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "users": users,
+                "ratings": ratings,
+                "index_pending": self._index.n_pending,
+                "pending_rows": len(self._pending_rows),
+                "log_rows": self._log.rows_in_log,
+                "genre_weight_users": len(self._genre_weights),
+                "neighbor_graphs": len(self._graphs),
+                "neighbor_graph_rebuilds": len(self._graph_rebuilds),
+                "item_tables": len(self._item_tables),
+                "item_table_rebuilds": len(self._item_rebuilds),
+            }
+
+    # --- Escrita (memória primeiro, depois disco) ---
+
+    def add_ratings(self, rows: list[dict]) -> None:
+        """Registra ratings em memória e aguarda o group commit do log.
+
+        O custo é proporcional ao número de linhas novas, não ao dataset."""
+        if not rows:
+            return
+        with self._lock:
+            self._pending_rows.extend(rows)
+            self._index.add_many(rows)
+            changed_users = {int(r["user_id"]) for r in rows}
+            for user_id in changed_users:
+                self._sim_cache.invalidate_user(user_id)
+                self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            for graph in list(self._graphs.values()):
+                graph.mark_dirty(changed_users)
+            for rebuilding in self._graph_rebuilds.values():
+                rebuilding.update(changed_users)
+            batch = self._log.enqueue(rows)
+        if self._index.n_pending >= Config.INDEX_MERGE_MIN_ROWS:
+            self._merge_wanted.set()
+        # Espera pelo fsync fora do lock para que requisições concorrentes
+        # caiam no mesmo lote. Se a gravação falhar o OSError sobe; as notas
+        # já estão em memória e reenviar é seguro (a última nota vale).
+        self._log.wait_durable(batch)
+
+    def set_genre_weights(self, user_id, weights: dict[str, float]) -> None:
+        """Substitui os pesos do usuário em memória; o disco é atualizado
+        pela thread de gravação (``flush_genre_weights``)."""
+        user_id = int(user_id)
+        with self._lock:
+            self._genre_weights[user_id] = dict(weights)
+            self._genre_weights_dirty = True
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+    def flush_genre_weights(self) -> None:
+        """Grava todos os pesos de gênero se houve mudança desde a última vez."""
+        with self._lock:
+            if not self._genre_weights_dirty:
+                return
+            snapshot = dict(self._genre_weights)
+            default = self._default_genre_weights
+            self._genre_weights_dirty = False
+        try:
+            save_genre_weights(snapshot, default)
+        except OSError:
+            with self._lock:
+                self._genre_weights_dirty = True
+            raise
+
+    # --- Merge do índice e compactação ---
+
+    def merge_index(self) -> None:
+        """Incorpora o delta do índice à matriz. As linhas do cache de
+        similaridades calculadas antes disso têm as colunas dos usuários
+        incorporados marcadas para correção, e esses usuários são
+        recalculados nos grafos de vizinhos (antes do merge, o lado das
+        colunas via as notas antigas deles)."""
+        merged = self._index.merge()
+        if merged:
+            self._sim_cache.mark_stale(merged)
+            with self._lock:
+                for graph in list(self._graphs.values()):
+                    graph.mark_dirty(merged)
+            logger.info(f"rating index merged users={len(merged)}")
+
+    def start_index_merge(
+        self,
+        interval: float = Config.INDEX_MERGE_SECONDS,
+    ) -> None:
+        """Inicia a thread que faz o merge do índice a cada intervalo (ou
+        antes, quando ``add_ratings`` vê o delta passar do limite)."""
+        if self._merger is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                self._merge_wanted.wait(interval)
+                self._merge_wanted.clear()
+                if not self._stop.is_set():
+                    self.merge_index()
+
+        self._merger = threading.Thread(
+            target=run, name="rating-index-merger", daemon=True
+        )
+        self._merger.start()
+
+    def compact(self) -> None:
+        """Incorpora o log de ratings ao snapshot base.
+
+        Nada aqui segura o lock do store: o log é rotacionado sem esperar a
+        fila e o snapshot, tirado depois, já contém as linhas rotacionadas."""
+        with self._compact_lock:
+            rotated = self._log.rotate()
+            if rotated is None:
+                return
+            snapshot = self.ratings()
+            save_ratings(snapshot)
+            self._log.discard_rotated()
+            logger.info(f"ratings log compacted rows={len(snapshot)}")
+
+    def start_compaction(
+        self,
+        interval: float = Config.COMPACT_INTERVAL_SECONDS,
+        min_rows: int = Config.COMPACT_MIN_ROWS,
+    ) -> None:
+        """Inicia a thread de compactação em segundo plano."""
+        if self._compactor is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                if self._log.rows_in_log >= min_rows:
+                    try:
+                        self.compact()
+                    except OSError as e:
+                        logger.error(f"ratings log compaction failed: {e}")
+
+        self._compactor = threading.Thread(
+            target=run, name="ratings-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def start_genre_weights_flush(
+        self, interval: float = Config.GENRE_WEIGHTS_FLUSH_SECONDS
+    ) -> None:
+        """Inicia a thread que grava os pesos de gênero em lote."""
+        if self._weights_flusher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.flush_genre_weights()
+                except OSError as e:
+                    logger.error(f"genre weights flush failed: {e}")
+
+        self._weights_flusher = threading.Thread(
+            target=run, name="genre-weights-flusher", daemon=True
+        )
+        self._weights_flusher.start()
+
+    def close(self) -> None:
+        """Para as threads de fundo, incorpora o que restou do log, grava os
+        pesos de gênero pendentes e fecha o arquivo."""
+        self._stop.set()
+        self._merge_wanted.set()
+        for thread in (self._merger, self._compactor, self._weights_flusher):
+            if thread is not None:
+                thread.join()
+        self._merger = self._compactor = self._weights_flusher = None
+        self.compact()
+        self.flush_genre_weights()
+        self._log.close()
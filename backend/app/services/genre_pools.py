@@ -0,0 +1,101 @@
+import numpy as np
+
+from app.config import Config
+from app.services.catalog_index import CatalogIndex
+from app.services.rating_matrix import RatingMatrix
+
+
+def _top(values: np.ndarray, size: int) -> np.ndarray:
+    """Posições dos ``size`` maiores valores (empate: ordem de linha)."""
+    if size <= 0:
+        return np.empty(0, dtype=np.int64)
+    if size >= len(values):
+        return np.argsort(-values, kind="stable")
+    top = np.argpartition(-values, size - 1)[:size]
+    return top[np.lexsort((top, -values[top]))]
+
+
+class GenrePools:
+    """Pools de candidatos por gênero, montados na carga.
+
+    Cada gênero tem três faixas de até ``size`` linhas do catálogo: as mais
+    avaliadas (``popular``), as de maior média com encolhimento para a média
+    global (``quality``) e um sorteio fixo das restantes (``explore``), para
+    que itens sem ratings também apareçam. Escolher uma linha custa O(1) no
+    tamanho do catálogo (só depende do número de gêneros)."""
+
+    def __init__(self, catalog: CatalogIndex, tiers: list[tuple], n_ratings: int):
+        self.catalog = catalog
+        self.n_ratings = n_ratings
+        self._tiers = tiers  # código de gênero -> (popular, quality, explore)
+        self._pools = [
+            np.unique(np.concatenate(t)) if t else np.empty(0, np.int64) for t in tiers
+        ]
+
+    @property
+    def tiers(self) -> list[tuple]:
+        """Faixas por código de gênero (para recriar os pools em outro processo)."""
+        return self._tiers
+
+    @classmethod
+    def build(
+        cls,
+        catalog: CatalogIndex,
+        matrix: RatingMatrix,
+        size: int = Config.GENRE_POOL_SIZE,
+        prior: float = Config.GENRE_POOL_PRIOR,
+        seed: int = 0,
+    ) -> "GenrePools":
+        cols = matrix.item_columns(catalog.ids)
+        known = cols >= 0
+        counts = np.zeros(len(catalog), dtype=np.float64)
+        sums = np.zeros(len(catalog), dtype=np.float64)
+        counts[known] = np.diff(matrix.item_indptr)[cols[known]]
+        sums[known] = matrix.item_sums[cols[known]]
+        global_mean = sums.sum() / counts.sum() if counts.sum() else 0.0
+        # Média bayesiana: poucos ratings puxam a nota para a média global
+        quality = (sums + prior * global_mean) / (counts + prior)
+
+        rng = np.random.default_rng(seed)
+        tiers = []
+        for code in range(len(catalog.genre_names)):
+            rows = catalog.genre_rows(catalog.genre_names[code])
+            if len(rows) == 0:
+                tiers.append(())
+                continue
+            popular = rows[_top(counts[rows], size)]
+            rated = rows[counts[rows] > 0]
+            best = rated[_top(quality[rated], size)]
+            rest = np.setdiff1d(rows, np.concatenate([popular, best]))
+            explore = rng.choice(rest, size=min(size, len(rest)), replace=False)
+            tiers.append((popular, best, explore))
+        return cls(catalog, tiers, len(matrix.data))
+
+    def sample(self, genre, k: int, rng) -> np.ndarray:
+        """Até ``k`` ids distintos do pool do gênero."""
+        code = self.catalog.genre_code(genre)
+        if code is None or len(self._pools[code]) == 0:
+            return np.empty(0, dtype=np.int64)
+        pool = self._pools[code]
+        rows = rng.choice(pool, size=min(k, len(pool)), replace=False)
+        return self.catalog.ids[rows]
+
+    def pick_outside_genres(self, genre_codes, rng, skip=None, attempts=32):
+        """Linha de um gênero fora de ``genre_codes`` e não marcada em
+        ``skip`` (máscara por linha): sorteia gênero, faixa e linha dentro
+        dela. Se todas as tentativas caem em linhas marcadas, recorre ao
+        sorteio no catálogo inteiro."""
+        excluded = set(genre_codes)
+        codes = [c for c, t in enumerate(self._tiers) if t and c not in excluded]
+        if codes:
+            for _ in range(attempts):
+                tier = self._tiers[codes[int(rng.integers(len(codes)))]]
+                rows = tier[int(rng.integers(len(tier)))]
+                if len(rows) == 0:
+                    continue
+                row = int(rows[int(rng.integers(len(rows)))])
+                if skip is None or not skip[row]:
+                    return row
+        return self.catalog.pick_outside_genres(
+            list(excluded), rng, skip=skip, attempts=0
+        )
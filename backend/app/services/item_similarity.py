@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+
+from app.config import Config
+from app.services.prediction_service import ITEM_METRICS
+from app.services.rating_matrix import RatingMatrix
+from app.utils import logger
+from app.utils.metrics import count_similarity_evaluations
+
+
+class ItemSimilarityTable:
+    """Tabela item×item truncada: os ``k`` itens mais similares de cada item.
+
+    ``item_cosine`` compara os vetores de notas dos itens; em
+    ``item_adjusted_cosine`` cada nota é centrada na média do usuário antes
+    (cosseno ajustado). A nota prevista de um candidato é o produto esparso
+    das notas do usuário com as linhas da tabela dos itens que ele avaliou."""
+
+    def __init__(self, metric: str, k: int, item_ids, neighbors, sims):
+        self.metric = metric
+        self.k = k
+        self.item_ids = item_ids  # (I,) ids ordenados
+        self.neighbors = neighbors  # (I, k) posições em item_ids, -1 = vazio
+        self.sims = sims  # (I, k) similaridades em ordem decrescente
+        self.fingerprint = None
+
+    @property
+    def adjusted(self) -> bool:
+        return self.metric == "item_adjusted_cosine"
+
+    # --- Construção ---
+
+    @classmethod
+    def build(
+        cls,
+        matrix: RatingMatrix,
+        metric: str,
+        k: int = Config.ITEM_NEIGHBORS_K,
+        block_bytes: int = Config.NEIGHBOR_BLOCK_BYTES,
+        items=None,
+    ) -> "ItemSimilarityTable":
+        """Constrói a tabela; com ``items`` só as linhas desses itens são
+        calculadas (o suficiente para predizer para um usuário que os avaliou)."""
+        n_items, nnz = matrix.n_items, len(matrix.data)
+        k = min(k, max(n_items - 1, 0))
+
+        # Permutação por item (CSC) da matriz; nota 0 = ausente (oculta)
+        indptr = matrix.item_indptr
+        rows = matrix.item_rows
+        values = matrix.item_values(centered=metric == "item_adjusted_cosine")
+        cols = np.repeat(np.arange(n_items), np.diff(indptr))
+        norms = np.sqrt(np.bincount(cols, weights=values**2, minlength=n_items))
+
+        if items is None:
+            positions = np.arange(n_items)
+        else:
+            positions = matrix.item_columns(np.unique(items))
+            positions = positions[positions >= 0]
+
+        neighbors = np.full((n_items, k), -1, dtype=np.int32)
+        sims = np.zeros((n_items, k), dtype=np.float32)
+        # ~3 arrays temporários de B × nnz floats por bloco
+        block = int(max(1, min(n_items, block_bytes // (max(1, nnz) * 8 * 3))))
+        starts = np.minimum(indptr[:-1], max(nnz - 1, 0))
+        for offset in range(0, len(positions) if k > 0 else 0, block):
+            pos = positions[offset : offset + block]
+            entries = matrix.gather_items(pos)
+            lengths = indptr[pos + 1] - indptr[pos]
+            dense = np.zeros((len(pos), matrix.n_users), dtype=np.float64)
+            dense[np.repeat(np.arange(len(pos)), lengths), rows[entries]] = values[
+                entries
+            ]
+
+            dots = np.add.reduceat(dense[:, rows] * values, starts, axis=1)
+            den = norms[pos, None] * norms[None, :]
+            block_sims = np.divide(dots, den, out=np.zeros_like(dots), where=den > 0)
+            block_sims[np.arange(len(pos)), pos] = 0.0
+
+            top = np.argpartition(-block_sims, k - 1, axis=1)[:, :k]
+            top_sims = np.take_along_axis(block_sims, top, axis=1)
+            rank = np.argsort(-top_sims, axis=1, kind="stable")
+            top = np.take_along_axis(top, rank, axis=1)
+            top_sims = np.take_along_axis(top_sims, rank, axis=1)
+            neighbors[pos] = np.where(top_sims != 0, top, -1)
+            sims[pos] = np.where(top_sims != 0, top_sims, 0.0)
+
+        count_similarity_evaluations(metric, len(positions) * n_items if k > 0 else 0)
+        logger.info(
+            f"item similarity built metric={metric} items={len(positions)}/{n_items} k={k} block={block}"
+        )
+        return cls(metric, k, matrix.item_ids.copy(), neighbors, sims)
+
+    # --- Predição ---
+
+    def predict(
+        self, rated_item_ids, rated_values, user_mean: float, item_ids
+    ) -> np.ndarray:
+        """Nota prevista para ``item_ids`` a partir das notas do usuário."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        preds = np.full(len(item_ids), user_mean, dtype=np.float64)
+        rated_pos = self.__positions(rated_item_ids)
+        found = rated_pos >= 0
+        if not found.any() or len(item_ids) == 0:
+            return preds
+
+        values = np.asarray(rated_values, dtype=np.float64)[found]
+        if self.adjusted:
+            values = values - user_mean
+        nb = self.neighbors[rated_pos[found]]
+        s = self.sims[rated_pos[found]].astype(np.float64)
+        valid = nb >= 0
+        weights = np.broadcast_to(values[:, None], nb.shape)[valid]
+        num = np.bincount(
+            nb[valid], weights=s[valid] * weights, minlength=len(self.item_ids)
+        )
+        den = np.bincount(
+            nb[valid], weights=np.abs(s[valid]), minlength=len(self.item_ids)
+        )
+
+        cand = self.__positions(item_ids)
+        known = np.flatnonzero(cand >= 0)
+        item_den = den[cand[known]]
+        ok = item_den != 0
+        ratio = num[cand[known[ok]]] / item_den[ok]
+        preds[known[ok]] = user_mean + ratio if self.adjusted else ratio
+        return preds
+
+    def __positions(self, item_ids) -> np.ndarray:
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        if len(self.item_ids) == 0:
+            return np.full(len(item_ids), -1, dtype=np.int64)
+        pos = np.minimum(
+            np.searchsorted(self.item_ids, item_ids), len(self.item_ids) - 1
+        )
+        return np.where(self.item_ids[pos] == item_ids, pos, -1)
+
+    # --- Persistência (build offline) ---
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            metric=self.metric,
+            k=self.k,
+            fingerprint=np.asarray(self.fingerprint, dtype=np.float64),
+            item_ids=self.item_ids,
+            neighbors=self.neighbors,
+            sims=self.sims,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ItemSimilarityTable":
+        with np.load(path) as f:
+            table = cls(
+                str(f["metric"]),
+                int(f["k"]),
+                f["item_ids"],
+                f["neighbors"],
+                f["sims"],
+            )
+            table.fingerprint = tuple(f["fingerprint"].tolist())
+        return table
+
+    @classmethod
+    def load_or_build(cls, index, metric: str, k: int = Config.ITEM_NEIGHBORS_K):
+        """Usa a tabela gerada offline se ela corresponder aos dados atuais
+        e ao ``k`` pedido (limitado, como no build, ao número de itens - 1)."""
+        if metric not in ITEM_METRICS:
+            raise ValueError(f"métrica item-item desconhecida: {metric}")
+        path = Config.ITEM_SIMILARITY_FILE.format(metric=metric)
+        fingerprint = index.fingerprint()
+        if os.path.exists(path):
+            table = cls.load(path)
+            expected_k = min(k, max(len(table.item_ids) - 1, 0))
+            if table.k == expected_k and table.fingerprint == fingerprint:
+                logger.info(f"item similarity loaded metric={metric} path={path}")
+                return table
+        table = cls.build(index.matrix(), metric, k)
+        table.fingerprint = fingerprint
+        return table
@@ -0,0 +1,200 @@
+import os
+import threading
+
+import numpy as np
+
+from app.config import Config
+from app.services.prediction_service import PredictionService
+from app.services.rating_matrix import RatingMatrix
+from app.utils import logger
+
+
+def top_k_neighbors(sims: np.ndarray, k: int) -> np.ndarray:
+    """Posições dos ``k`` maiores valores não nulos de ``sims``, em ordem
+    decrescente. ``k <= 0`` devolve todos os não nulos."""
+    nonzero = np.flatnonzero(sims)
+    if 0 < k < len(nonzero):
+        nonzero = nonzero[np.argpartition(-sims[nonzero], k - 1)[:k]]
+    return nonzero[np.argsort(-sims[nonzero], kind="stable")]
+
+
+class NeighborGraph:
+    """Top-k usuários mais similares de cada usuário, para uma métrica.
+
+    Construído em blocos de usuários com memória limitada (``block_bytes``)
+    na inicialização ou offline (``build_neighbors.py``). Quando um usuário
+    avalia algo, só a lista dele e as entradas reversas (usuários cuja lista
+    contém ou passa a conter ele) são recalculadas; os demais pares não mudam.
+    Quando um vizinho sai de uma lista cheia (ou cai de similaridade), o
+    (k+1)-ésimo vizinho, desconhecido, talvez devesse entrar: a lista fica
+    marcada como desatualizada (``n_stale``) e o ``DataStore`` reconstrói o
+    grafo em segundo plano quando elas passam de
+    ``NEIGHBORS_REBUILD_FRACTION`` dos usuários."""
+
+    def __init__(self, metric: str, k: int):
+        self.prediction_service = PredictionService(metric)
+        self.metric = self.prediction_service.metric
+        self.k = k
+        self.fingerprint = None
+        self._lock = threading.Lock()
+        self._neighbors: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self._reverse: dict[int, set[int]] = {}
+        self._dirty: set[int] = set()
+        self._stale: set[int] = set()
+
+    # --- Construção ---
+
+    @classmethod
+    def build(
+        cls,
+        matrix: RatingMatrix,
+        metric: str,
+        k: int = Config.NEIGHBORS_K,
+        block_bytes: int = Config.NEIGHBOR_BLOCK_BYTES,
+    ) -> "NeighborGraph":
+        graph = cls(metric, k)
+        # Por alvo: ~7 arrays de n_users floats (somas e resultado) e ~5 do
+        # tamanho das co-avaliações (em média sum(notas por item²) / usuários)
+        item_counts = np.diff(matrix.item_indptr).astype(np.float64)
+        co_ratings = (item_counts**2).sum() / max(1, matrix.n_users)
+        per_row = int((7 * matrix.n_users + 5 * co_ratings) * 8) + 1
+        block = int(max(1, min(matrix.n_users, block_bytes // per_row)))
+        for start in range(0, matrix.n_users, block):
+            end = min(matrix.n_users, start + block)
+            sims = graph.prediction_service.similarity_block(
+                matrix.dense_rows(start, end), matrix
+            )
+            sims[np.arange(end - start), np.arange(start, end)] = 0.0
+            for offset, row_sims in enumerate(sims):
+                user_id = int(matrix.user_ids[start + offset])
+                graph._set(user_id, matrix, row_sims)
+        logger.info(
+            f"neighbor graph built metric={graph.metric} users={matrix.n_users} k={k} block={block}"
+        )
+        return graph
+
+    def _set(self, user_id: int, matrix: RatingMatrix, sims: np.ndarray) -> None:
+        old = self._neighbors.get(user_id)
+        if old is not None:
+            for v in old[0].tolist():
+                self._reverse.get(v, set()).discard(user_id)
+        top = top_k_neighbors(sims, self.k)
+        ids = matrix.user_ids[top]
+        self._neighbors[user_id] = (ids, sims[top])
+        for v in ids.tolist():
+            self._reverse.setdefault(v, set()).add(user_id)
+
+    # --- Consulta ---
+
+    def neighbors(self, user_id) -> tuple[np.ndarray, np.ndarray] | None:
+        """(ids dos vizinhos, similaridades) em ordem decrescente, ou None."""
+        return self._neighbors.get(int(user_id))
+
+    @property
+    def n_users(self) -> int:
+        return len(self._neighbors)
+
+    @property
+    def n_stale(self) -> int:
+        """Listas que podem ter perdido um vizinho desde a construção."""
+        return len(self._stale)
+
+    # --- Atualização incremental ---
+
+    def mark_dirty(self, user_ids) -> None:
+        with self._lock:
+            self._dirty.update(int(u) for u in user_ids)
+
+    def refresh(self, matrix: RatingMatrix, sim_cache=None) -> None:
+        """Recalcula os usuários marcados como alterados e suas entradas reversas."""
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            for user_id in dirty:
+                self._refresh_user(user_id, matrix, sim_cache)
+
+    def _refresh_user(self, user_id: int, matrix: RatingMatrix, sim_cache) -> None:
+        if sim_cache is not None:
+            sims = sim_cache.similarities(self.prediction_service, user_id, matrix)
+        else:
+            sims = self.prediction_service.similarities(user_id, matrix)
+        row = matrix.user_row(user_id)
+        if row is not None:
+            sims[row] = 0.0
+        self._set(user_id, matrix, sims)
+
+        # Similaridade é simétrica: sim(v, u) = sim(u, v) para todo v
+        affected = set(matrix.user_ids[np.flatnonzero(sims)].tolist())
+        affected |= self._reverse.get(user_id, set())
+        affected.discard(user_id)
+        rows = matrix.user_rows(list(affected))
+        for v, v_row in zip(affected, rows.tolist()):
+            sim = float(sims[v_row]) if v_row >= 0 else 0.0
+            self._update_entry(v, user_id, sim)
+
+    def _update_entry(self, v: int, u: int, sim: float) -> None:
+        ids, sims = self._neighbors.get(v, (np.empty(0, np.int64), np.empty(0)))
+        keep = ids != u
+        if 0 < self.k <= len(ids) and not keep.all() and sim < sims[~keep][0]:
+            # Lista cheia: quem ficou de fora talvez devesse ocupar o lugar de u
+            self._stale.add(v)
+        ids, sims = ids[keep], sims[keep]
+        if sim != 0 and (self.k <= 0 or len(ids) < self.k or sim > sims[-1]):
+            pos = int(np.searchsorted(-sims, -sim, side="right"))
+            ids = np.insert(ids, pos, u)
+            sims = np.insert(sims, pos, sim)
+            if 0 < self.k < len(ids):
+                self._reverse.get(int(ids[-1]), set()).discard(v)
+                ids, sims = ids[: self.k], sims[: self.k]
+            self._reverse.setdefault(u, set()).add(v)
+        else:
+            self._reverse.get(u, set()).discard(v)
+        self._neighbors[v] = (ids, sims)
+
+    # --- Persistência (build offline) ---
+
+    def save(self, path: str) -> None:
+        user_ids = np.array(sorted(self._neighbors), dtype=np.int64)
+        lists = [self._neighbors[u] for u in user_ids.tolist()]
+        lengths = np.array([len(ids) for ids, _ in lists], dtype=np.int64)
+        np.savez(
+            path,
+            metric=self.metric,
+            k=self.k,
+            fingerprint=np.asarray(self.fingerprint, dtype=np.float64),
+            user_ids=user_ids,
+            offsets=np.concatenate([[0], np.cumsum(lengths)]),
+            neighbor_ids=np.concatenate([ids for ids, _ in lists] or [[]]),
+            sims=np.concatenate([s for _, s in lists] or [[]]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NeighborGraph":
+        with np.load(path) as f:
+            graph = cls(str(f["metric"]), int(f["k"]))
+            graph.fingerprint = tuple(f["fingerprint"].tolist())
+            offsets = f["offsets"]
+            neighbor_ids = f["neighbor_ids"].astype(np.int64)
+            sims = f["sims"]
+            for i, u in enumerate(f["user_ids"].tolist()):
+                ids = neighbor_ids[offsets[i] : offsets[i + 1]]
+                graph._neighbors[u] = (ids, sims[offsets[i] : offsets[i + 1]])
+                for v in ids.tolist():
+                    graph._reverse.setdefault(v, set()).add(u)
+        return graph
+
+    @classmethod
+    def load_or_build(cls, index, metric: str, k: int = Config.NEIGHBORS_K):
+        """Usa o grafo gerado offline se ele corresponder aos dados atuais."""
+        metric = PredictionService(metric).metric
+        path = Config.NEIGHBORS_FILE.format(metric=metric)
+        fingerprint = index.fingerprint()
+        if os.path.exists(path):
+            graph = cls.load(path)
+            if graph.k == k and graph.fingerprint == fingerprint:
+                logger.info(f"neighbor graph loaded metric={metric} path={path}")
+                return graph
+        graph = cls.build(index.matrix(), metric, k)
+        graph.fingerprint = fingerprint
+        return graph
@@ -1,68 +1,130 @@
 import numpy as np
 
+from app.services.rating_matrix import RatingMatrix
+from app.utils.metrics import count_similarity_evaluations
+
+# Métricas usuário-usuário e item-item suportadas
+USER_METRICS = ("cossin", "pearson")
+ITEM_METRICS = ("item_cosine", "item_adjusted_cosine")
+
+# Nomes aceitos para cada métrica (o frontend envia "cosine")
+METRIC_ALIASES = {
+    None: "cossin",
+    "cossin": "cossin",
+    "cosine": "cossin",
+    "pearson": "pearson",
+    "item_cosine": "item_cosine",
+    "item_adjusted_cosine": "item_adjusted_cosine",
+}
+
 
 class PredictionService:
     def __init__(self, metric: str | None = "cossin"):
-        self.metric = metric
+        self.metric = METRIC_ALIASES.get(metric, metric)
+
+    def similarities(self, user_id, matrix: RatingMatrix) -> np.ndarray:
+        """Similaridade de ``user_id`` com todos os usuários da matriz.
+
+        Retorna um array alinhado a ``matrix.user_ids``; pares sem itens em
+        comum suficientes valem 0."""
+        cols, values = matrix.user_ratings(user_id)
+        count_similarity_evaluations(self.metric, matrix.n_users)
+        targets = np.zeros(len(cols), dtype=np.int64)
+        sums = self.__common_sums(targets, cols, values, 1, matrix)
+        return self.__similarity(sums)[0]
+
+    def pair_similarity(self, user_id, other_id, matrix: RatingMatrix) -> float:
+        """Similaridade de um único par, só com as notas dos dois usuários."""
+        cols, values = matrix.user_ratings(user_id)
+        other_cols, other_values = matrix.user_ratings(other_id)
+        _, mine, theirs = np.intersect1d(
+            cols, other_cols, assume_unique=True, return_indices=True
+        )
+        count_similarity_evaluations(self.metric, 1)
+        t = values[mine].astype(np.float64)
+        r = other_values[theirs].astype(np.float64)
+        sums = {
+            "n": len(t),
+            "r": r.sum(),
+            "t": t.sum(),
+            "rr": (r * r).sum(),
+            "tt": (t * t).sum(),
+            "rt": (r * t).sum(),
+        }
+        sums = {
+            key: np.array([[value]], dtype=np.float64) for key, value in sums.items()
+        }
+        return float(self.__similarity(sums)[0, 0])
+
+    def similarity_block(self, targets: np.ndarray, matrix: RatingMatrix) -> np.ndarray:
+        """Similaridade de um bloco de usuários (linhas densas ``B × n_items``)
+        contra todos os usuários da matriz; retorna ``B × n_users``."""
+        count_similarity_evaluations(self.metric, len(targets) * matrix.n_users)
+        rows, cols = np.nonzero(targets)
+        sums = self.__common_sums(rows, cols, targets[rows, cols], len(targets), matrix)
+        return self.__similarity(sums)
 
-    def predict(self, u1, u2, user_item_dict, sim_cache) -> float:
-        pred = 0.0
+    @staticmethod
+    def __common_sums(targets, cols, values, n_targets: int, matrix: RatingMatrix):
+        """Somatórios por (alvo, usuário) restritos aos itens em comum.
+
+        Cada nota ``values[j]`` do alvo ``targets[j]`` no item ``cols[j]`` é
+        cruzada só com as notas desse item (fatia da permutação por item), de
+        modo que o custo acompanha o número de co-avaliações, não o dataset."""
+        cols = np.asarray(cols, dtype=np.int64)
+        lengths = matrix.item_indptr[cols + 1] - matrix.item_indptr[cols]
+        positions = matrix.gather_items(cols)
+        r = matrix.item_values(positions)
+        t = np.repeat(np.asarray(values, dtype=np.float64), lengths)
+        keys = np.repeat(np.asarray(targets, dtype=np.int64), lengths)
+        keys = keys * matrix.n_users + matrix.item_rows[positions]
+        # Nota 0 = oculta (índice mascarado): não conta como item em comum
+        present = r != 0
+        if not present.all():
+            r, t, keys = r[present], t[present], keys[present]
+
+        size = n_targets * matrix.n_users
+        shape = (n_targets, matrix.n_users)
+
+        def per_user(weights=None):
+            return np.bincount(keys, weights=weights, minlength=size).reshape(shape)
+
+        return {
+            "n": per_user().astype(np.float64),
+            "r": per_user(r),
+            "t": per_user(t),
+            "rr": per_user(r * r),
+            "tt": per_user(t * t),
+            "rt": per_user(r * t),
+        }
+
+    def __similarity(self, s) -> np.ndarray:
         if self.metric == "cossin":
-            pred += self.__cosine_similarity(u1, u2, user_item_dict, sim_cache)
+            return self.__cosine_similarity(s)
         elif self.metric == "pearson":
-            pred += self.__pearson_correlation(u1, u2, user_item_dict, sim_cache)
-        return pred
-
-    def __pearson_correlation(self, u1, u2, user_item_dict, sim_cache):
-        """Calcula Pearson entre u1 e u2 usando dicionários user->items.
-        Usa cache para evitar recomputação."""
-        key = tuple(sorted((int(u1), int(u2))))
-        if key in sim_cache:
-            return sim_cache[key]
-
-        u1_items = user_item_dict.get(u1, {})
-        u2_items = user_item_dict.get(u2, {})
-        common = set(u1_items.keys()).intersection(u2_items.keys())
-        if len(common) < 2:
-            sim_cache[key] = 0.0
-            return 0.0
-
-        r1 = np.array([u1_items[i] for i in common], dtype=float)
-        r2 = np.array([u2_items[i] for i in common], dtype=float)
-        r1m = r1.mean()
-        r2m = r2.mean()
-
-        num = ((r1 - r1m) * (r2 - r2m)).sum()
-        den = np.sqrt(((r1 - r1m) ** 2).sum() * ((r2 - r2m) ** 2).sum())
-        sim = float(num / den) if den != 0 else 0.0
-        sim_cache[key] = sim
-        return sim
-
-    def __cosine_similarity(self, u1, u2, user_item_dict, sim_cache):
-        """Calcula Similaridade de Cossenos (mais robusta para esparsidade)."""
-        key = tuple(sorted((int(u1), int(u2))))
-        if key in sim_cache:
-            return sim_cache[key]
-
-        u1_items = user_item_dict.get(u1, {})
-        u2_items = user_item_dict.get(u2, {})
-        common = set(u1_items.keys()).intersection(u2_items.keys())
-
-        if len(common) < 1:  # Cossenos precisa de apenas 1 item em comum.
-            sim_cache[key] = 0.0
-            return 0.0
-
-        r1 = np.array([u1_items[i] for i in common], dtype=float)
-        r2 = np.array([u2_items[i] for i in common], dtype=float)
-
-        dot_product = np.dot(r1, r2)
-        norm_u1 = np.linalg.norm(r1)
-        norm_u2 = np.linalg.norm(r2)
-
-        if norm_u1 == 0 or norm_u2 == 0:
-            sim_cache[key] = 0.0
-            return 0.0
-
-        sim = float(dot_product / (norm_u1 * norm_u2))
-        sim_cache[key] = sim
-        return sim
+            return self.__pearson_correlation(s)
+        return np.zeros_like(s["n"])
+
+    @staticmethod
+    def __pearson_correlation(s) -> np.ndarray:
+        """Pearson contra todos, sobre os itens em comum.
+        Exige pelo menos 2 itens em comum."""
+        n = s["n"]
+        # Forma escalada por n: com notas inteiras os termos são exatos, então
+        # variância nula resulta em 0 exato (como na versão par a par).
+        num = n * s["rt"] - s["r"] * s["t"]
+        den = np.sqrt((n * s["rr"] - s["r"] ** 2) * (n * s["tt"] - s["t"] ** 2))
+        sims = np.zeros_like(num)
+        ok = (n >= 2) & (den != 0)
+        sims[ok] = num[ok] / den[ok]
+        return sims
+
+    @staticmethod
+    def __cosine_similarity(s) -> np.ndarray:
+        """Similaridade de Cossenos (mais robusta para esparsidade).
+        Cossenos precisa de apenas 1 item em comum."""
+        den = np.sqrt(s["rr"] * s["tt"])
+        sims = np.zeros_like(den)
+        ok = (s["n"] >= 1) & (den != 0)
+        sims[ok] = s["rt"][ok] / den[ok]
+        return sims
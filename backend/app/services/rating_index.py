@@ -0,0 +1,282 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.services.rating_matrix import (
+    MaskedRatingMatrix,
+    OverlayRatingMatrix,
+    RatingMatrix,
+)
+
+
+class RatingIndex:
+    """Ratings em layout compacto com estatísticas globais incrementais.
+
+    O estado consolidado fica numa ``RatingMatrix`` (ids int32, notas int8,
+    ordenada por usuário e por item, com offsets). Ratings novos entram num
+    delta pequeno, por usuário, e atualizam contagem, soma e maior user id
+    em O(1). Leituras combinam base e delta (``OverlayRatingMatrix``) sem
+    reconstruir nada; a incorporação do delta à matriz (``merge``) roda fora
+    do caminho das requisições. Uma nota repetida para o mesmo
+    (usuário, item) substitui a anterior. Notas são inteiras (1–5)."""
+
+    def __init__(self, matrix: RatingMatrix | None = None, stats=None):
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._matrix = matrix if matrix is not None else RatingMatrix.empty()
+        # user_id -> {item_id: nota}; cada dicionário interno é substituído,
+        # nunca alterado, então uma cópia rasa basta como snapshot
+        self._delta: dict[int, dict[int, int]] = {}
+        self._n_pending = 0
+        self._n_new_users = 0  # usuários do delta que não estão na base
+        self._view: RatingMatrix | None = None
+        if stats is not None:
+            # (contagem, soma, maior user id) já conhecidos
+            self._count, self._total, self._max_user_id = stats
+        else:
+            self._count = len(self._matrix.data)
+            self._total = float(self._matrix.user_sums.sum())
+            self._max_user_id = (
+                int(self._matrix.user_ids.max()) if self._matrix.n_users else 0
+            )
+        self.version = 0
+
+    @classmethod
+    def from_ratings(cls, ratings_df: pd.DataFrame) -> "RatingIndex":
+        index = cls(RatingMatrix.from_ratings(ratings_df))
+        index.version += 1
+        return index
+
+    # --- Atualização ---
+
+    def _previous(self, user_id: int, item_id: int) -> int | None:
+        previous = self._delta.get(user_id, {}).get(item_id)
+        if previous is not None:
+            return previous
+        m = self._matrix
+        row, col = m.user_row(user_id), m.item_column(item_id)
+        if row is None or col is None:
+            return None
+        start, end = m.indptr[row], m.indptr[row + 1]
+        pos = start + int(np.searchsorted(m.indices[start:end], col))
+        if pos < end and m.indices[pos] == col:
+            return int(m.data[pos])
+        return None
+
+    def _add(self, user_id: int, item_id: int, rating: int, touched: dict) -> None:
+        previous = self._previous(user_id, item_id)
+        if previous is None:
+            self._total += rating
+            self._count += 1
+        else:
+            self._total += rating - previous
+        items = touched.get(user_id)
+        if items is None:
+            if user_id not in self._delta and self._matrix.user_row(user_id) is None:
+                self._n_new_users += 1
+            items = touched[user_id] = dict(self._delta.get(user_id, {}))
+        if item_id not in items:
+            self._n_pending += 1
+        items[item_id] = rating
+        self._delta[user_id] = items
+        if user_id > self._max_user_id:
+            self._max_user_id = user_id
+
+    def add(self, user_id: int, item_id: int, rating: int) -> None:
+        with self._lock:
+            self._add(int(user_id), int(item_id), int(rating), {})
+            self._view = None
+            self.version += 1
+
+    def add_many(self, rows: list[dict]) -> None:
+        with self._lock:
+            touched = {}
+            for r in rows:
+                self._add(
+                    int(r["user_id"]), int(r["item_id"]), int(r["rating"]), touched
+                )
+            self._view = None
+            self.version += 1
+
+    def merge(self) -> set[int]:
+        """Incorpora o delta à matriz base; retorna os usuários incorporados.
+
+        A reconstrução (inserções ordenadas + permutação por item) roda fora
+        do lock: enquanto isso as leituras seguem vendo base + delta, e notas
+        novas chegam normalmente. Chamado pela thread de merge do
+        ``DataStore``, nunca por uma requisição."""
+        with self._merge_lock:
+            with self._lock:
+                if not self._delta:
+                    return set()
+                base, delta = self._matrix, dict(self._delta)
+            matrix = _merged(base, delta)
+            with self._lock:
+                self._matrix = matrix
+                for user_id, items in delta.items():
+                    current = self._delta[user_id]
+                    if current is items:
+                        del self._delta[user_id]
+                        continue
+                    # Notas que chegaram durante o merge continuam pendentes
+                    rest = {i: r for i, r in current.items() if items.get(i) != r}
+                    if rest:
+                        self._delta[user_id] = rest
+                    else:
+                        del self._delta[user_id]
+                self._n_pending = sum(len(items) for items in self._delta.values())
+                self._n_new_users = sum(
+                    1 for user_id in self._delta if matrix.user_row(user_id) is None
+                )
+                self._view = None
+            return set(delta)
+
+    def snapshot(self) -> "RatingIndex":
+        """Índice somente leitura sobre a matriz base (sem o delta, que tem
+        no máximo um intervalo de merge de atraso), para avaliação."""
+        with self._lock:
+            index = RatingIndex(self._matrix)
+            index.version = self.version
+            return index
+
+    def masked(self, user_id, item_ids) -> "RatingIndex":
+        """Índice somente leitura sem as notas de ``user_id`` em ``item_ids``.
+
+        Para avaliação leave-out: reaproveita a matriz já construída em vez
+        de reconstruir o índice a partir de um DataFrame sem essas linhas.
+        Usado sobre índices sem delta (``snapshot``); se houver, é
+        incorporado antes."""
+        self.merge()
+        with self._lock:
+            base = self._matrix
+            count, total = self._count, self._total
+            max_user_id, version = self._max_user_id, self.version
+        matrix = MaskedRatingMatrix(base, int(user_id), item_ids)
+        index = RatingIndex(
+            matrix, (count - matrix.n_hidden, total - matrix.hidden_sum, max_user_id)
+        )
+        index.version = version
+        return index
+
+    # --- Consultas ---
+
+    def matrix(self) -> RatingMatrix:
+        """Matriz do estado atual: a base, ou, havendo delta, uma visão que
+        combina os dois (criada uma vez por versão, sem copiar arrays)."""
+        with self._lock:
+            if not self._delta:
+                return self._matrix
+            if self._view is None:
+                self._view = OverlayRatingMatrix(self._matrix, dict(self._delta))
+            return self._view
+
+    @property
+    def n_pending(self) -> int:
+        """Notas no delta, ainda não incorporadas à matriz base."""
+        return self._n_pending
+
+    def has_user(self, user_id) -> bool:
+        with self._lock:
+            if int(user_id) in self._delta:
+                return True
+            return self._matrix.user_row(user_id) is not None
+
+    def user_ids(self) -> list[int]:
+        with self._lock:
+            base, pending = self._matrix.user_ids, list(self._delta)
+        if not pending:
+            return base.tolist()
+        return np.union1d(base, pending).tolist()
+
+    def max_user_id(self) -> int:
+        return self._max_user_id
+
+    def user_ratings(self, user_id) -> tuple[np.ndarray, np.ndarray]:
+        """Ids dos itens avaliados pelo usuário e as notas (int8)."""
+        return self.matrix().user_item_ratings(user_id)
+
+    def user_items(self, user_id) -> dict[int, int]:
+        """Cópia de item→nota do usuário."""
+        item_ids, values = self.user_ratings(user_id)
+        return dict(zip(item_ids.tolist(), values.tolist()))
+
+    def item_ratings(self, item_id) -> dict[int, int]:
+        """Cópia de usuário→nota do item."""
+        with self._lock:
+            m, delta = self._matrix, dict(self._delta)
+        rows, values = m.item_ratings(item_id)
+        ratings = dict(zip(m.user_ids[rows].tolist(), values.tolist()))
+        item_id = int(item_id)
+        for user_id, items in delta.items():
+            if item_id in items:
+                ratings[user_id] = items[item_id]
+        return ratings
+
+    def user_count(self, user_id) -> int:
+        return len(self.user_ratings(user_id)[0])
+
+    def item_count(self, item_id) -> int:
+        return len(self.item_ratings(item_id))
+
+    def user_mean(self, user_id, default: float | None = None) -> float | None:
+        return self.matrix().user_mean(user_id, default)
+
+    def item_mean(self, item_id, default: float | None = None) -> float | None:
+        ratings = self.item_ratings(item_id)
+        if not ratings:
+            return default
+        return sum(ratings.values()) / len(ratings)
+
+    def user_means(self) -> dict[int, float]:
+        with self._lock:
+            pending = list(self._delta)
+        m = self.matrix()
+        means = dict(zip(m.user_ids.tolist(), m.user_means.tolist()))
+        for user_id in pending:
+            means[user_id] = m.user_mean(user_id)
+        return means
+
+    @property
+    def n_ratings(self) -> int:
+        return self._count
+
+    @property
+    def n_users(self) -> int:
+        """Usuários com alguma nota (base + novos no delta), sem tocar na matriz."""
+        with self._lock:
+            return self._matrix.n_users + self._n_new_users
+
+    def fingerprint(self) -> tuple[float, float, float]:
+        """Identifica o conteúdo do índice (usado por artefatos gerados offline)."""
+        with self._lock:
+            return (float(self._count), float(self._total), float(self._max_user_id))
+
+    def global_mean(self) -> float:
+        with self._lock:
+            return self._total / self._count if self._count else 3.0
+
+
+def _merged(matrix: RatingMatrix, delta: dict[int, dict[int, int]]) -> RatingMatrix:
+    """Matriz com o delta incorporado por inserções ordenadas (sem re-sort)."""
+    n = sum(len(items) for items in delta.values())
+    keys = np.fromiter(
+        ((u << 32) | i for u, items in delta.items() for i in items), np.int64, n
+    )
+    values = np.fromiter(
+        (r for items in delta.values() for r in items.values()), np.int8, n
+    )
+    order = np.argsort(keys)
+    keys, values = keys[order], values[order]
+
+    base_keys = matrix.keys()
+    pos = np.searchsorted(base_keys, keys)
+    exists = pos < len(base_keys)
+    exists[exists] = base_keys[pos[exists]] == keys[exists]
+    data = matrix.data.copy()
+    data[pos[exists]] = values[exists]
+    new = ~exists
+    item_ids = np.union1d(matrix.item_ids, keys[new] & 0xFFFFFFFF)
+    keys = np.insert(base_keys, pos[new], keys[new])
+    data = np.insert(data, pos[new], values[new])
+    return RatingMatrix.from_sorted(keys >> 32, keys & 0xFFFFFFFF, data, item_ids)
@@ -0,0 +1,371 @@
+import numpy as np
+import pandas as pd
+
+# Arrays que compõem uma RatingMatrix (os de entrada e os derivados)
+PARTS = (
+    "user_ids",
+    "item_ids",
+    "indptr",
+    "indices",
+    "data",
+    "row_of",
+    "user_sums",
+    "user_means",
+    "item_indptr",
+    "item_rows",
+    "item_data",
+    "item_sums",
+)
+
+
+class RatingMatrix:
+    """Matriz usuário×item esparsa no formato CSR (arrays de índice/offset).
+
+    Linha ``r`` corresponde a ``user_ids[r]``; suas notas ficam em
+    ``data[indptr[r]:indptr[r + 1]]`` e as colunas (posições em ``item_ids``)
+    em ``indices`` no mesmo intervalo. Permite comparar um usuário contra
+    todos os outros em uma única passada vetorizada.
+
+    Layout compacto: ids e colunas em int32, notas (inteiras, 1–5) em int8.
+    Além da ordem por usuário, guarda a permutação por item (``item_indptr``,
+    ``item_rows``, ``item_data``), de modo que as notas de um usuário ou de
+    um item são fatias contíguas, sem cópia."""
+
+    def __init__(self, user_ids, item_ids, indptr, indices, data):
+        self.user_ids = np.asarray(user_ids, dtype=np.int32)
+        self.item_ids = np.asarray(item_ids, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.int8)
+        # Linha de cada nota, usada para agregar por usuário com bincount
+        counts = np.diff(self.indptr)
+        self.row_of = np.repeat(np.arange(len(user_ids), dtype=np.int32), counts)
+        self.user_sums = np.bincount(
+            self.row_of, weights=self.data, minlength=len(user_ids)
+        )
+        self.user_means = np.divide(
+            self.user_sums, counts, out=np.zeros(len(user_ids)), where=counts > 0
+        )
+
+        # Permutação por item (CSC): linhas agrupadas por coluna
+        order = np.argsort(self.indices, kind="stable")
+        self.item_indptr = np.zeros(len(item_ids) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.indices, minlength=len(item_ids)),
+            out=self.item_indptr[1:],
+        )
+        self.item_rows = self.row_of[order]
+        self.item_data = self.data[order]
+        self.item_sums = np.bincount(
+            self.indices, weights=self.data, minlength=len(item_ids)
+        )
+
+    @classmethod
+    def empty(cls) -> "RatingMatrix":
+        return cls(np.empty(0), np.empty(0), np.zeros(1), np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_ratings(cls, ratings_df: pd.DataFrame) -> "RatingMatrix":
+        return cls.from_arrays(
+            ratings_df.user_id.to_numpy(dtype=np.int64),
+            ratings_df.item_id.to_numpy(dtype=np.int64),
+            ratings_df.rating.to_numpy(dtype=np.int8),
+        )
+
+    @classmethod
+    def from_arrays(cls, users, items, values) -> "RatingMatrix":
+        user_ids, rows = np.unique(users, return_inverse=True)
+        item_ids, cols = np.unique(items, return_inverse=True)
+
+        # Notas repetidas para o mesmo (usuário, item): vale a última
+        key = rows.astype(np.int64) * len(item_ids) + cols
+        _, last = np.unique(key[::-1], return_index=True)
+        keep = np.sort(len(key) - 1 - last)
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(user_ids)), out=indptr[1:])
+        return cls(user_ids, item_ids, indptr, cols[order], values[order])
+
+    @classmethod
+    def from_sorted(cls, users, items, values, item_ids) -> "RatingMatrix":
+        """Como ``from_arrays``, para pares (usuário, item) já únicos e
+        ordenados por usuário e item, com ``item_ids`` já conhecidos
+        (dispensa a deduplicação e as ordenações)."""
+        starts = np.flatnonzero(np.diff(users, prepend=users[:1] - 1))
+        indptr = np.append(starts, len(users)).astype(np.int64)
+        cols = np.searchsorted(item_ids, items)
+        return cls(users[starts], item_ids, indptr, cols, values)
+
+    def parts(self) -> dict[str, np.ndarray]:
+        """Todos os arrays da matriz, inclusive os derivados, por nome."""
+        return {name: getattr(self, name) for name in PARTS}
+
+    @classmethod
+    def from_parts(cls, parts: dict[str, np.ndarray]) -> "RatingMatrix":
+        """Matriz sobre arrays já calculados (``parts``), sem cópia nem
+        recálculo; usada para anexar uma matriz de memória compartilhada."""
+        matrix = cls.__new__(cls)
+        for name in PARTS:
+            setattr(matrix, name, parts[name])
+        return matrix
+
+    def keys(self) -> np.ndarray:
+        """Chave ordenada ``user_id << 32 | item_id`` de cada nota."""
+        return (self.user_ids[self.row_of].astype(np.int64) << 32) | self.item_ids[
+            self.indices
+        ].astype(np.int64)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    def user_row(self, user_id) -> int | None:
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < self.n_users and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    def user_rows(self, user_ids) -> np.ndarray:
+        """Linha de cada user id (-1 para usuários fora da matriz)."""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if self.n_users == 0:
+            return np.full(len(user_ids), -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.user_ids, user_ids), self.n_users - 1)
+        return np.where(self.user_ids[rows] == user_ids, rows, -1)
+
+    def item_columns(self, item_ids) -> np.ndarray:
+        """Coluna de cada item id (-1 para itens sem nenhuma nota)."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        if self.n_items == 0:
+            return np.full(len(item_ids), -1, dtype=np.int64)
+        cols = np.minimum(np.searchsorted(self.item_ids, item_ids), self.n_items - 1)
+        return np.where(self.item_ids[cols] == item_ids, cols, -1)
+
+    def item_column(self, item_id) -> int | None:
+        col = int(np.searchsorted(self.item_ids, item_id))
+        if col < self.n_items and self.item_ids[col] == item_id:
+            return col
+        return None
+
+    def user_ratings(self, user_id) -> tuple[np.ndarray, np.ndarray]:
+        """Colunas e notas do usuário (fatias da matriz, sem cópia)."""
+        row = self.user_row(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8)
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def user_item_ratings(self, user_id) -> tuple[np.ndarray, np.ndarray]:
+        """Ids dos itens avaliados pelo usuário (não colunas) e as notas."""
+        cols, values = self.user_ratings(user_id)
+        return self.item_ids[cols], values
+
+    def user_mean(self, user_id, default: float | None = None) -> float | None:
+        row = self.user_row(user_id)
+        if row is None:
+            return default
+        return float(self.user_means[row])
+
+    def item_ratings(self, item_id) -> tuple[np.ndarray, np.ndarray]:
+        """Linhas (usuários) e notas do item (fatias da permutação por item)."""
+        col = self.item_column(item_id)
+        if col is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8)
+        start, end = self.item_indptr[col], self.item_indptr[col + 1]
+        return self.item_rows[start:end], self.item_data[start:end]
+
+    def rated_mask(self, user_id, item_ids) -> np.ndarray:
+        """True para cada item de ``item_ids`` já avaliado pelo usuário.
+
+        Máscara sobre as colunas + uma posição extra (sempre False) que
+        absorve os itens fora da matriz (coluna -1)."""
+        mask = np.zeros(self.n_items + 1, dtype=bool)
+        mask[self.user_ratings(user_id)[0]] = True
+        return mask[self.item_columns(item_ids)]
+
+    def gather_rows(self, rows) -> np.ndarray:
+        """Posições (em ``indices``/``data``) de todas as notas das linhas dadas."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def item_values(self, positions=None, centered: bool = False) -> np.ndarray:
+        """Notas (float) da permutação por item nas posições dadas (todas se
+        ``None``); com ``centered``, menos a média de cada usuário. Notas
+        ausentes (ocultas, em ``MaskedRatingMatrix``) valem 0."""
+        if positions is None:
+            values, rows = self.item_data.astype(np.float64), self.item_rows
+        else:
+            values = self.item_data[positions].astype(np.float64)
+            rows = self.item_rows[positions] if centered else None
+        if centered:
+            values -= self.user_means[rows]
+        return values
+
+    def gather_items(self, cols) -> np.ndarray:
+        """Posições (em ``item_rows``/``item_data``) das notas das colunas dadas."""
+        cols = np.asarray(cols, dtype=np.int64)
+        starts = self.item_indptr[cols]
+        lengths = self.item_indptr[cols + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def dense_rows(self, start: int, end: int) -> np.ndarray:
+        """Bloco denso ``(end - start) × n_items`` das linhas ``start:end``."""
+        block = np.zeros((end - start, self.n_items), dtype=np.float64)
+        sl = slice(self.indptr[start], self.indptr[end])
+        block[self.row_of[sl] - start, self.indices[sl]] = self.data[sl]
+        return block
+
+    def dense_user_vector(self, user_id) -> np.ndarray:
+        """Vetor de notas do usuário sobre todas as colunas (0 = não avaliado)."""
+        vec = np.zeros(self.n_items, dtype=np.float64)
+        cols, vals = self.user_ratings(user_id)
+        vec[cols] = vals
+        return vec
+
+
+def combine_ratings(item_ids, values, pending: dict[int, int]):
+    """Notas do usuário (ids ordenados) com as de ``pending`` (item→nota)
+    aplicadas por cima; retorna ids e notas ordenados por id."""
+    new_ids = np.fromiter(pending, np.int64, len(pending))
+    new_values = np.fromiter(pending.values(), np.int8, len(pending))
+    keep = ~np.isin(item_ids, new_ids)
+    item_ids = np.concatenate([item_ids[keep], new_ids])
+    values = np.concatenate([values[keep], new_values])
+    order = np.argsort(item_ids, kind="stable")
+    return item_ids[order], values[order]
+
+
+class OverlayRatingMatrix(RatingMatrix):
+    """Visão de uma ``RatingMatrix`` com ratings ainda não incorporados.
+
+    Compartilha todos os arrays da matriz base (nada é copiado) e guarda
+    as notas pendentes por usuário (``pending``: user_id → {item_id: nota}).
+    As consultas de um usuário (``user_ratings``, ``user_mean``...) combinam
+    base e pendentes; as passadas vetorizadas sobre os demais usuários veem
+    a base até o próximo merge do ``RatingIndex``."""
+
+    def __init__(self, matrix: RatingMatrix, pending: dict[int, dict[int, int]]):
+        self.__dict__.update(matrix.__dict__)
+        self.pending = pending
+        self._combined: dict[int, tuple] = {}
+
+    def __combined(self, user_id):
+        user_id = int(user_id)
+        found = self._combined.get(user_id)
+        if found is None:
+            cols, values = super().user_ratings(user_id)
+            item_ids, values = combine_ratings(
+                self.item_ids[cols], values, self.pending[user_id]
+            )
+            cols = self.item_columns(item_ids)
+            known = cols >= 0
+            found = (item_ids, values, cols[known].astype(np.int32), values[known])
+            self._combined[user_id] = found
+        return found
+
+    def user_ratings(self, user_id) -> tuple[np.ndarray, np.ndarray]:
+        if int(user_id) not in self.pending:
+            return super().user_ratings(user_id)
+        return self.__combined(user_id)[2:]
+
+    def user_item_ratings(self, user_id) -> tuple[np.ndarray, np.ndarray]:
+        if int(user_id) not in self.pending:
+            return super().user_item_ratings(user_id)
+        return self.__combined(user_id)[:2]
+
+    def user_mean(self, user_id, default: float | None = None) -> float | None:
+        if int(user_id) not in self.pending:
+            return super().user_mean(user_id, default)
+        return float(self.__combined(user_id)[1].mean())
+
+
+class MaskedRatingMatrix(RatingMatrix):
+    """Visão de uma ``RatingMatrix`` com algumas notas de um usuário ocultas.
+
+    Usada na avaliação leave-out: em vez de reconstruir a matriz sem as notas
+    de teste, compartilha todos os arrays da matriz original (nada
+    proporcional ao dataset é copiado) e guarda só o que muda: as notas
+    restantes e a média do usuário e a posição de cada nota oculta na
+    permutação por item. As consultas sobre o usuário e sobre os itens
+    (``item_ratings``, ``item_values``) aplicam essas diferenças; a linha do
+    usuário em ``data`` e os agregados (``user_sums``, ``item_sums``...) são
+    os da matriz original."""
+
+    def __init__(self, matrix: RatingMatrix, user_id, hidden_item_ids):
+        self.__dict__.update(matrix.__dict__)
+        self.masked_user = user_id
+        self.hidden_sum = 0.0
+        self.n_hidden = 0
+        self.n_remaining = 0
+        self.hidden_positions = np.empty(0, dtype=np.int64)
+        row = matrix.user_row(user_id)
+        if row is None:
+            return
+
+        cols, values = matrix.user_ratings(user_id)
+        hidden = np.isin(cols, matrix.item_columns(hidden_item_ids))
+        self.n_hidden = int(hidden.sum())
+        self.hidden_sum = float(values[hidden].sum(dtype=np.int64))
+        self.n_remaining = len(cols) - self.n_hidden
+        self._row = row
+        self._remaining = cols[~hidden], values[~hidden]
+        self._mean = float(values[~hidden].mean()) if self.n_remaining else 0.0
+
+        # Posição de cada nota do usuário na permutação por item (as linhas
+        # de uma coluna estão em ordem crescente)
+        positions = np.empty(len(cols), dtype=np.int64)
+        for j, col in enumerate(cols.tolist()):
+            lo, hi = matrix.item_indptr[col], matrix.item_indptr[col + 1]
+            positions[j] = lo + np.searchsorted(matrix.item_rows[lo:hi], row)
+        self._positions = positions
+        self.hidden_positions = positions[hidden]
+        self._hidden_cols = cols[hidden]
+
+    def user_row(self, user_id) -> int | None:
+        # Usuário com todas as notas ocultas se comporta como ausente
+        if user_id == self.masked_user and self.n_remaining == 0:
+            return None
+        return super().user_row(user_id)
+
+    def user_ratings(self, user_id) -> tuple[np.ndarray, np.ndarray]:
+        if user_id == self.masked_user and self.n_hidden:
+            return self._remaining
+        return super().user_ratings(user_id)
+
+    def user_mean(self, user_id, default: float | None = None) -> float | None:
+        if user_id == self.masked_user and self.n_hidden:
+            return self._mean if self.n_remaining else default
+        return super().user_mean(user_id, default)
+
+    def item_ratings(self, item_id) -> tuple[np.ndarray, np.ndarray]:
+        rows, values = super().item_ratings(item_id)
+        col = self.item_column(item_id)
+        if self.n_hidden and col is not None and col in self._hidden_cols:
+            keep = rows != self._row
+            return rows[keep], values[keep]
+        return rows, values
+
+    def item_values(self, positions=None, centered: bool = False) -> np.ndarray:
+        values = super().item_values(positions, centered)
+        if not self.n_hidden:
+            return values
+        if positions is None:
+            own, hidden = self._positions, self.hidden_positions
+        else:
+            positions = np.asarray(positions, dtype=np.int64)
+            own = np.flatnonzero(np.isin(positions, self._positions))
+            hidden = np.flatnonzero(np.isin(positions, self.hidden_positions))
+        if centered:
+            values[own] += self.user_means[self._row] - self._mean
+        values[hidden] = 0.0
+        return values
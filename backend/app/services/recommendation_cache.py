@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import Config
+
+
+class RecommendationCache:
+    """Cache LRU com TTL de respostas prontas de ``/recomendar``.
+
+    A chave é (usuário, n, métrica, limite de candidatos) e cada entrada
+    guarda as versões de dados com que foi calculada: a versão global
+    (mudanças estruturais, como grafo ou tabela item-item reconstruídos) e
+    a do usuário (seus ratings e pesos de gênero). Se qualquer uma mudou, a
+    entrada é descartada na leitura. Ratings de outros usuários também
+    afetam as predições; o TTL limita por quanto tempo isso fica de fora."""
+
+    def __init__(
+        self,
+        max_entries: int = Config.RECOMMEND_CACHE_MAX_ENTRIES,
+        ttl: float = Config.RECOMMEND_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple, versions: tuple[int, int]) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_versions, expires_at, value = entry
+                if entry_versions == versions and time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, versions: tuple[int, int], value: dict) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (versions, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -1,156 +1,251 @@
 import time
-from app.services.prediction_service import PredictionService
+import numpy as np
+from app.config import Config
+from app.services.item_similarity import ItemSimilarityTable
+from app.services.neighbor_graph import top_k_neighbors
+from app.services.prediction_service import ITEM_METRICS, PredictionService
 from app.utils import logger
+from app.utils.metrics import count_neighbor_source, recommend_scope, stage
+
+MAX_GENRE_BOOST = 0.05  # máximo 5% de aumento
+
+
+def top_n_positions(scores: np.ndarray, n: int) -> np.ndarray:
+    """Posições dos ``n`` maiores scores, em ordem decrescente.
+
+    Usa ``argpartition`` (O(len)) e ordena apenas os ``n`` selecionados."""
+    if n <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if n < len(scores):
+        top = np.argpartition(-scores, n - 1)[:n]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
 
 
 class RecommendationService:
-    def __init__(self, metric):
+    def __init__(self, metric, k: int | None = None, sim_cache=None):
+        # k=None: NEIGHBORS_K lido a cada recomendação (não na importação)
         self.prediction_service = PredictionService(metric=metric)
+        self.k = k
+        self.sim_cache = sim_cache
+
+    def neighbors(self, user_id, matrix, graph=None) -> tuple[np.ndarray, np.ndarray]:
+        """Linhas da matriz e similaridades dos até ``k`` vizinhos do usuário.
+
+        Usa o grafo pré-computado quando disponível; senão calcula a
+        similaridade contra todos e seleciona o top-k na hora."""
+        metric = self.prediction_service.metric
+        found = graph.neighbors(user_id) if graph is not None else None
+        if found is not None:
+            count_neighbor_source(metric, "graph")
+            rows = matrix.user_rows(found[0])
+            keep = rows >= 0
+            return rows[keep], found[1][keep]
+
+        if self.sim_cache is not None:
+            count_neighbor_source(metric, "cache")
+            sims = self.sim_cache.similarities(self.prediction_service, user_id, matrix)
+        else:
+            count_neighbor_source(metric, "computed")
+            sims = self.prediction_service.similarities(user_id, matrix)
+        own_row = matrix.user_row(user_id)
+        if own_row is not None:
+            sims[own_row] = 0.0
+        k = self.k if self.k is not None else Config.NEIGHBORS_K
+        rows = top_k_neighbors(sims, k)
+        return rows, sims[rows]
+
+    def predict_ratings(
+        self, user_id, item_ids, index, graph=None, item_table=None
+    ) -> np.ndarray:
+        """Predição de nota do usuário para vários itens de uma vez.
+
+        Agrega ``sim * (nota - média do vizinho)`` sobre as notas dos até
+        ``k`` vizinhos do usuário com um único ``bincount`` por item e
+        devolve um array alinhado a ``item_ids``. Itens sem vizinhos úteis
+        recebem a média do usuário. Nas métricas item-item a predição vem
+        da tabela de itens similares (``item_table``)."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        global_mean = index.global_mean()
+        user_mean = index.user_mean(user_id, global_mean)
+
+        metric = self.prediction_service.metric
+        if metric in ITEM_METRICS:
+            rated_ids, rated_values = index.user_ratings(user_id)
+            if item_table is None:
+                count_neighbor_source(metric, "computed")
+                # Só as linhas dos itens avaliados pelo usuário são necessárias
+                with stage("similarity"):
+                    item_table = ItemSimilarityTable.build(
+                        index.matrix(), metric, items=rated_ids
+                    )
+            else:
+                count_neighbor_source(metric, "item_table")
+            return item_table.predict(rated_ids, rated_values, user_mean, item_ids)
+
+        preds = np.full(len(item_ids), user_mean, dtype=np.float64)
+        matrix = index.matrix()
+        if matrix.n_users == 0 or len(item_ids) == 0:
+            return preds
+
+        with stage("similarity"):
+            rows, sims = self.neighbors(user_id, matrix, graph)
+        if len(rows) == 0:
+            return preds
+
+        # Contribuição de cada nota dos vizinhos, somada por coluna (item)
+        positions = matrix.gather_rows(rows)
+        lengths = matrix.indptr[rows + 1] - matrix.indptr[rows]
+        rater_sims = np.repeat(sims, lengths)
+        deviations = matrix.data[positions] - np.repeat(
+            matrix.user_means[rows], lengths
+        )
+        columns = matrix.indices[positions]
+        num = np.bincount(
+            columns, weights=rater_sims * deviations, minlength=matrix.n_items
+        )
+        den = np.bincount(columns, weights=np.abs(rater_sims), minlength=matrix.n_items)
 
-    def __predict_rating(
+        cols = matrix.item_columns(item_ids)
+        known = np.flatnonzero(cols >= 0)
+        item_den = den[cols[known]]
+        ok = item_den != 0
+        preds[known[ok]] = user_mean + num[cols[known[ok]]] / item_den[ok]
+        return preds
+
+    def score_items(
         self,
-        ratings_df,
         user_id,
-        item_id,
-        user_item_dict,
-        user_means,
-        sim_cache,
-        item_to_ratings,
-    ):
-        """Predição de nota para (user,item) usando Pearson + cache."""
-        global_mean = ratings_df.rating.mean() if not ratings_df.empty else 3.0
-        user_mean = user_means.get(user_id, global_mean)
-
-        if item_id not in item_to_ratings:
-            return user_mean
-
-        num, den = 0.0, 0.0
-        for other_user, other_rating in item_to_ratings[item_id]:
-            if other_user == user_id:
-                continue
-            sim = self.prediction_service.predict(
-                user_id, other_user, user_item_dict, sim_cache
-            )
-            if sim == 0:
-                continue
-            other_mean = user_means.get(other_user, global_mean)
-            num += sim * (other_rating - other_mean)
-            den += abs(sim)
-
-        if den == 0:
-            return user_mean
-        return user_mean + (num / den)
+        rows,
+        catalog,
+        index,
+        genre_weights,
+        graph=None,
+        item_table=None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Notas previstas e scores com boost de gênero das linhas ``rows``
+        do catálogo, como arrays NumPy."""
+        preds = self.predict_ratings(
+            user_id, catalog.ids[rows], index, graph, item_table
+        )
+        # Peso por código de gênero; o último (código -1, sem gênero) vale 0
+        weights = np.array(
+            [float(genre_weights.get(g, 0.0)) for g in catalog.genre_names] + [0.0],
+            dtype=np.float64,
+        )
+        boosts = np.minimum(weights, MAX_GENRE_BOOST)[catalog.genre_codes[rows]]
+        scores = preds * (1.0 + boosts)
+        return preds, scores
 
     def recommend_items(
         self,
         user_id,
         n=10,
-        ratings_df=None,
-        items_df=None,
+        index=None,
+        catalog=None,
         genre_weights=None,
-        max_items_to_check=5000,
+        max_items_to_check=None,
+        graph=None,
+        item_table=None,
+        random_state=None,
+        genre_pools=None,
     ) -> list:
-        start = time.time()
-
-        logger.info(f"recommend_items start user_id={user_id} n={n}")
-
-        # Pré-computações
-        user_item_dict = {}
-        user_means = {}
-        item_to_ratings = {}
-
-        for uid, g in ratings_df.groupby("user_id"):
-            d = dict(zip(g["item_id"], g["rating"]))
-            user_item_dict[int(uid)] = d
-            user_means[int(uid)] = float(g["rating"].mean())
-
-        for iid, g in ratings_df.groupby("item_id"):
-            item_to_ratings[int(iid)] = list(
-                zip(g["user_id"].astype(int), g["rating"].astype(float))
+        """Top-``n`` recomendações do usuário; cada etapa (índice,
+        candidatos, similaridade, pontuação, ordenação, cold-start) é medida
+        em ``/metrics``. O item surpresa do cold-start vem de ``genre_pools``
+        quando informado (senão, do catálogo inteiro)."""
+        with recommend_scope(self.prediction_service.metric):
+            return self.__recommend_items(
+                user_id,
+                n,
+                index,
+                catalog,
+                genre_weights,
+                max_items_to_check,
+                graph,
+                item_table,
+                random_state,
+                genre_pools,
             )
 
-        rated_items = set(ratings_df[ratings_df.user_id == user_id].item_id.tolist())
-        candidates = []
-        sim_cache = {}
-
-        # Cold-start: gêneros curtidos
-        liked_items = ratings_df[
-            (ratings_df.user_id == user_id) & (ratings_df.rating >= 4)
-        ].item_id.tolist()
-        liked_genres = (
-            items_df[items_df.id.isin(liked_items)].genre.unique().tolist()
-            if liked_items
-            else []
-        )
+    def __recommend_items(
+        self,
+        user_id,
+        n,
+        index,
+        catalog,
+        genre_weights,
+        max_items_to_check,
+        graph,
+        item_table,
+        random_state,
+        genre_pools,
+    ) -> list:
+        start = time.time()
 
-        # Amostra para acelerar
+        logger.info(f"recommend_items start user_id={user_id} n={n}")
 
-        total_items = len(items_df)
-        sample_size = min(
-            max_items_to_check if max_items_to_check else total_items, total_items
-        )
-        items_sample = items_df.sample(
-            n=sample_size, random_state=int(time.time() * 1000) % 10000
-        ).to_dict(orient="records")
-
-        # Calcular predições
-        for item in items_sample:
-            item_id = int(item["id"])
-            if item_id in rated_items:
-                continue
-            base_pred = self.__predict_rating(
-                ratings_df,
-                user_id,
-                item_id,
-                user_item_dict,
-                user_means,
-                sim_cache,
-                item_to_ratings,
+        # Notas do usuário (base + ratings ainda não incorporados)
+        with stage("index"):
+            rated_ids, rated_values = index.user_ratings(user_id)
+
+        with stage("candidates"):
+            # Cold-start: gêneros curtidos
+            liked_items = rated_ids[rated_values >= 4]
+            liked_rows = catalog.rows(liked_items)
+            liked_genres = np.unique(catalog.genre_codes[liked_rows[liked_rows >= 0]])
+
+            # Catálogo inteiro como candidato; itens já avaliados saem por máscara
+            rated_rows = catalog.rows(rated_ids)
+            rated_mask = np.zeros(len(catalog), dtype=bool)
+            rated_mask[rated_rows[rated_rows >= 0]] = True
+            rows = np.flatnonzero(~rated_mask)
+
+            # Limite opcional de latência: pontua só um subconjunto (reprodutível)
+            if max_items_to_check and max_items_to_check < len(rows):
+                rng = np.random.default_rng(int(user_id))
+                rows = np.sort(rng.choice(rows, size=max_items_to_check, replace=False))
+
+        # Calcular predições de todos os candidatos de uma vez
+        with stage("scoring"):
+            base_preds, scores = self.score_items(
+                user_id, rows, catalog, index, genre_weights, graph, item_table
             )
-            genre = str(item["genre"])
-            weight = float(genre_weights.get(genre, 0.0))
 
-            max_boost = 0.05  # máximo 5% de aumento
-            applied_boost = min(weight, max_boost)
-            score = base_pred * (1.0 + applied_boost)
-
-            candidates.append(
+        # Dicionários só para o top-n final
+        with stage("sort"):
+            candidates = [
                 {
-                    "item_id": item_id,
-                    "title": item["title"],
-                    "artist": item.get("artist", ""),
-                    "genre": genre,
-                    "score": float(score),
-                    "base_pred": float(base_pred),
+                    **catalog.record(rows[pos]),
+                    "score": float(scores[pos]),
+                    "base_pred": float(base_preds[pos]),
                 }
-            )
-
-        candidates.sort(key=lambda x: x["score"], reverse=True)
+                for pos in top_n_positions(scores, n)
+            ]
 
         # Diversidade no cold-start: sempre incluir 1 item de outro gênero
         if (not any(genre_weights.values())) or (len(liked_items) <= 2):
-            top = candidates[: max(0, n - 1)]
-            other_pool = items_df[
-                ~items_df.genre.isin(liked_genres) & ~items_df.id.isin(rated_items)
-            ]
-            if not other_pool.empty:
-                surprise = other_pool.sample(
-                    n=1, random_state=int(time.time() % 10000)
-                ).iloc[0]
-                surprise_rec = {
-                    "item_id": int(surprise.id),
-                    "title": surprise.title,
-                    "artist": getattr(surprise, "artist", ""),
-                    "genre": str(surprise.genre),
-                    "score": float(0.5),
-                    "base_pred": float(0.5),
-                }
-                final = top[: n - 1] + [surprise_rec]
-                elapsed = time.time() - start
-                logger.info(
-                    f"recommend_items finished user_id={user_id} time={elapsed:.3f}s (cold-start with surprise)"
+            with stage("cold_start"):
+                top = candidates[: max(0, n - 1)]
+                source = genre_pools if genre_pools is not None else catalog
+                surprise = source.pick_outside_genres(
+                    liked_genres.tolist(),
+                    np.random.default_rng(random_state),
+                    skip=rated_mask,
                 )
-                return final
+                if surprise is not None:
+                    surprise_rec = {
+                        **catalog.record(surprise),
+                        "score": float(0.5),
+                        "base_pred": float(0.5),
+                    }
+                    final = top[: n - 1] + [surprise_rec]
+                    elapsed = time.time() - start
+                    logger.info(
+                        f"recommend_items finished user_id={user_id} time={elapsed:.3f}s (cold-start with surprise)"
+                    )
+                    return final
 
         elapsed = time.time() - start
         logger.info(f"recommend_items finished user_id={user_id} time={elapsed:.3f}s")
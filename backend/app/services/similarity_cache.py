@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import Config
+from app.services.prediction_service import PredictionService
+from app.services.rating_matrix import RatingMatrix
+
+# Acima de tantos pares desatualizados numa linha, recalculá-la inteira
+# (uma passada um-contra-todos) sai mais barato que corrigir par a par
+MAX_STALE_PAIRS = 8
+
+
+class _Entry:
+    __slots__ = ("user_ids", "sims", "stale")
+
+    def __init__(self, user_ids, sims):
+        self.user_ids = user_ids
+        self.sims = sims
+        self.stale: set[int] = set()
+
+
+class SimilarityCache:
+    """Cache LRU, compartilhado pelo processo, das similaridades usuário×todos.
+
+    Cada entrada guarda, para (métrica, usuário), a similaridade desse
+    usuário com todos os outros, ou seja, todos os pares (u, v) de uma vez.
+    Quando ``u`` avalia algo, apenas os pares que envolvem ``u`` são
+    invalidados: a linha de ``u`` sai do cache e, nas demais linhas, só a
+    coluna de ``u`` é marcada como desatualizada e corrigida na próxima
+    leitura (a similaridade é simétrica), calculando só o par a partir das
+    notas dos dois usuários."""
+
+    def __init__(self, max_entries: int = Config.SIM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, int], _Entry] = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def similarities(
+        self, prediction_service: PredictionService, user_id, matrix: RatingMatrix
+    ) -> np.ndarray:
+        """Similaridade de ``user_id`` com todos os usuários de ``matrix``."""
+        metric = prediction_service.metric
+        key = (metric, int(user_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            generation = self._generation
+
+        if entry is None:
+            sims = prediction_service.similarities(user_id, matrix)
+            with self._lock:
+                # Descarta se houve invalidação durante o cálculo
+                if generation == self._generation and self.max_entries > 0:
+                    self._entries[key] = _Entry(matrix.user_ids, sims)
+                    self._evict()
+            return sims.copy()
+
+        with self._lock:
+            stale, entry.stale = entry.stale, set()
+        pending = set()
+        if len(stale) > MAX_STALE_PAIRS:
+            sims = prediction_service.similarities(user_id, matrix)
+        else:
+            sims = self.__aligned(entry, matrix)
+            for other in stale:
+                row = matrix.user_row(other)
+                if row is None:
+                    pending.add(other)
+                    continue
+                if sims is entry.sims:
+                    sims = sims.copy()
+                sims[row] = prediction_service.pair_similarity(user_id, other, matrix)
+        with self._lock:
+            entry.user_ids, entry.sims = matrix.user_ids, sims
+            entry.stale |= pending
+        return sims.copy()
+
+    @staticmethod
+    def __aligned(entry: _Entry, matrix: RatingMatrix) -> np.ndarray:
+        """Reindexa a linha em cache se usuários novos entraram na matriz."""
+        if entry.user_ids is matrix.user_ids or np.array_equal(
+            entry.user_ids, matrix.user_ids
+        ):
+            return entry.sims
+        sims = np.zeros(matrix.n_users, dtype=np.float64)
+        rows = matrix.user_rows(entry.user_ids)
+        found = rows >= 0
+        sims[rows[found]] = entry.sims[found]
+        return sims
+
+    def invalidate_user(self, user_id) -> None:
+        """Invalida só os pares que envolvem ``user_id``."""
+        user_id = int(user_id)
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                if key[1] == user_id:
+                    del self._entries[key]
+                else:
+                    self._entries[key].stale.add(user_id)
+
+    def mark_stale(self, user_ids) -> None:
+        """Marca as colunas de ``user_ids`` como desatualizadas em todas as
+        linhas, sem descartar nenhuma (após o merge do índice: linhas
+        calculadas antes dele viam as notas antigas desses usuários)."""
+        user_ids = {int(u) for u in user_ids}
+        with self._lock:
+            self._generation += 1
+            for key, entry in self._entries.items():
+                entry.stale |= user_ids - {key[1]}
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CATALOG_VERSION = 1
+STRING_COLUMNS = ("title", "artist", "genre")
+
+
+def source_digest(path: str) -> str:
+    """Hash do CSV de origem; o binário só vale para esse conteúdo exato."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _code_dtype(n_categories: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def save_catalog(items: pd.DataFrame, path: str, digest: str) -> None:
+    """Grava o catálogo em formato colunar binário (um diretório).
+
+    - ``id.npy``: ids em int32;
+    - ``<coluna>.codes.npy``: código de cada linha na tabela de strings
+      (-1 = vazio), no menor inteiro que comporta a tabela;
+    - ``<coluna>.strings.bin`` + ``<coluna>.offsets.npy``: strings únicas
+      (internadas) em UTF-8 concatenado e seus offsets.
+
+    O diretório é montado ao lado e trocado por rename, então um leitor
+    nunca vê um catálogo pela metade."""
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, "id.npy"), items.id.to_numpy(dtype=np.int32))
+    for col in STRING_COLUMNS:
+        codes, uniques = pd.factorize(items[col], sort=True)
+        encoded = [str(s).encode("utf-8") for s in uniques]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        np.save(
+            os.path.join(tmp_path, f"{col}.codes.npy"),
+            codes.astype(_code_dtype(len(uniques))),
+        )
+        np.save(os.path.join(tmp_path, f"{col}.offsets.npy"), offsets)
+        with open(os.path.join(tmp_path, f"{col}.strings.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+
+    meta = {
+        "version": CATALOG_VERSION,
+        "rows": int(len(items)),
+        "columns": ["id", *STRING_COLUMNS],
+        "source_digest": digest,
+    }
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def read_catalog_meta(path: str) -> dict | None:
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != CATALOG_VERSION:
+        return None
+    return meta
+
+
+def _string_table(path: str, col: str) -> list[str]:
+    offsets = np.load(os.path.join(path, f"{col}.offsets.npy"))
+    with open(os.path.join(path, f"{col}.strings.bin"), "rb") as f:
+        blob = f.read()
+    return [
+        blob[start:end].decode("utf-8")
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+def load_catalog(path: str) -> pd.DataFrame:
+    """Carrega o catálogo binário mapeando os arrays em memória (mmap).
+
+    Colunas de texto viram ``Categorical`` sobre as tabelas internadas, então
+    cada string distinta existe uma única vez na memória."""
+    ids = np.load(os.path.join(path, "id.npy"), mmap_mode="r")
+    columns = {"id": pd.Series(ids, copy=False)}
+    for col in STRING_COLUMNS:
+        codes = np.load(os.path.join(path, f"{col}.codes.npy"), mmap_mode="r")
+        columns[col] = pd.Categorical.from_codes(
+            codes, categories=_string_table(path, col)
+        )
+    return pd.DataFrame(columns)
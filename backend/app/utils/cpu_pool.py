@@ -0,0 +1,32 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils import profiling
+
+
+class CpuPool:
+    """Pool limitado de threads para o trabalho pesado (NumPy/pandas).
+
+    Rotas ``async`` entregam recomendação e avaliação a este pool em vez de
+    ocupar o threadpool padrão do Starlette, de modo que endpoints leves
+    (``/genres``, ``/feedback``) continuam respondendo enquanto jobs
+    pesados rodam. O contexto (``contextvars``) da requisição é
+    propagado para a thread que executa a tarefa, inclusive o pedido de
+    profiling (``app.utils.profiling``)."""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cpu-worker"
+        )
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, profiling.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -2,15 +2,37 @@ import os
 import json
 
 from app.config import Config
+from app.utils.logger import logger
 
+# Chave dos pesos padrão, usados por quem ainda não tem pesos próprios
+DEFAULT_KEY = "default"
 
-def load_genre_weights():
-    if os.path.exists(Config.GENRE_WEIGHTS_FILE):
-        with open(Config.GENRE_WEIGHTS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
 
+def load_genre_weights() -> tuple[dict[int, dict[str, float]], dict[str, float]]:
+    """Pesos de gênero por usuário (``{user_id: {gênero: peso}}``) e os
+    pesos padrão (chave ``"default"`` do arquivo)."""
+    if not os.path.exists(Config.GENRE_WEIGHTS_FILE):
+        return {}, {}
+    with open(Config.GENRE_WEIGHTS_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not all(isinstance(w, dict) for w in data.values()):
+        # Formato antigo: um único dicionário global, que passa a ser o
+        # padrão de todos os usuários sem pesos próprios
+        logger.info("legacy global genre weights loaded as default")
+        return {}, data
+    default = data.pop(DEFAULT_KEY, {})
+    return {int(user_id): weights for user_id, weights in data.items()}, default
 
-def save_genre_weights(d):
-    with open(Config.GENRE_WEIGHTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(d, f)
+
+def save_genre_weights(
+    d: dict[int, dict[str, float]], default: dict[str, float] | None = None
+) -> None:
+    """Grava os pesos de forma atômica (arquivo temporário + rename)."""
+    data = {DEFAULT_KEY: default or {}}
+    data.update((str(user_id), weights) for user_id, weights in d.items())
+    tmp_path = Config.GENRE_WEIGHTS_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, Config.GENRE_WEIGHTS_FILE)
@@ -1,7 +1,17 @@
 import pandas as pd
 
 from app.config import Config
+from app.utils.catalog import load_catalog, read_catalog_meta, source_digest
+from app.utils.logger import logger
 
 
 def load_items():
+    """Catálogo de itens. Usa o formato binário (``build_catalog.py``) quando
+    ele existe e foi gerado a partir do CSV atual; o CSV segue sendo a fonte
+    da verdade."""
+    meta = read_catalog_meta(Config.CATALOG_DIR)
+    if meta is not None:
+        if meta["source_digest"] == source_digest(Config.ITEMS_FILE):
+            return load_catalog(Config.CATALOG_DIR)
+        logger.info(f"catalog binary is stale, reading {Config.ITEMS_FILE}")
     return pd.read_csv(Config.ITEMS_FILE)
@@ -0,0 +1,260 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+COUNT_BUCKETS = (0, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += self._samples(items)
+        return lines
+
+    def _samples(self, items) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos (contagens por faixa, soma e total)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # contagem por bucket (+Inf no fim), soma
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][slot] += 1
+            state[1] += value
+
+    def _samples(self, items) -> list[str]:
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                labels = _format_labels(self.labelnames, key, le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo, exportado no formato texto do
+    Prometheus (sem dependências externas)."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições por rota",
+    ("method", "route", "status"),
+)
+RECOMMEND_STAGE_SECONDS = REGISTRY.histogram(
+    "recommend_stage_duration_seconds",
+    "Tempo exclusivo de cada etapa de recommend_items",
+    ("metric", "stage"),
+)
+SIMILARITY_EVALUATIONS = REGISTRY.histogram(
+    "recommend_similarity_evaluations",
+    "Similaridades calculadas por recomendação (pares usuário-usuário ou item-item)",
+    ("metric",),
+    buckets=COUNT_BUCKETS,
+)
+SIMILARITY_EVALUATIONS_TOTAL = REGISTRY.counter(
+    "similarity_evaluations_total",
+    "Similaridades calculadas no processo, inclusive fora de requisições",
+    ("metric",),
+)
+NEIGHBOR_SOURCE_TOTAL = REGISTRY.counter(
+    "recommend_neighbor_source_total",
+    "Origem dos vizinhos / similaridades usados na predição",
+    ("metric", "source"),
+)
+RECOMMEND_CACHE_TOTAL = REGISTRY.counter(
+    "recommend_cache_requests_total",
+    "Consultas ao cache de respostas de /recomendar (hit, miss, bypass)",
+    ("result",),
+)
+RECOMMEND_CACHE = REGISTRY.gauge(
+    "recommend_cache",
+    "Estado do cache de respostas de /recomendar",
+    ("stat",),
+)
+SIMILARITY_CACHE = REGISTRY.gauge(
+    "similarity_cache",
+    "Estado do cache de similaridades (entradas, acertos, falhas, taxa de acerto)",
+    ("stat",),
+)
+DATASTORE_SIZE = REGISTRY.gauge(
+    "datastore_size",
+    "Tamanhos dos dados mantidos em memória",
+    ("kind",),
+)
+
+
+class _Scope:
+    """Estado de uma recomendação: pilha de etapas abertas e contagem de
+    similaridades calculadas."""
+
+    __slots__ = ("metric", "stack", "similarity_evaluations")
+
+    def __init__(self, metric: str):
+        self.metric = metric
+        self.stack: list[list[float]] = []
+        self.similarity_evaluations = 0
+
+
+_scope: ContextVar[_Scope | None] = ContextVar("metrics_scope", default=None)
+
+
+@contextmanager
+def recommend_scope(metric: str):
+    """Delimita uma recomendação: etapas aninhadas registram só o próprio
+    tempo (o das sub-etapas é descontado) e, no fim, o número de
+    similaridades calculadas é observado."""
+    scope = _Scope(metric)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+        SIMILARITY_EVALUATIONS.observe(scope.similarity_evaluations, metric=metric)
+
+
+@contextmanager
+def stage(name: str):
+    """Mede uma etapa da recomendação corrente (sem escopo, não registra)."""
+    scope = _scope.get()
+    if scope is None:
+        yield
+        return
+    frame = [0.0]  # tempo gasto em sub-etapas
+    scope.stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        scope.stack.pop()
+        if scope.stack:
+            scope.stack[-1][0] += elapsed
+        RECOMMEND_STAGE_SECONDS.observe(
+            elapsed - frame[0], metric=scope.metric, stage=name
+        )
+
+
+def count_similarity_evaluations(metric: str, n: int) -> None:
+    SIMILARITY_EVALUATIONS_TOTAL.inc(n, metric=metric)
+    scope = _scope.get()
+    if scope is not None:
+        scope.similarity_evaluations += n
+
+
+def count_neighbor_source(metric: str, source: str) -> None:
+    NEIGHBOR_SOURCE_TOTAL.inc(metric=metric, source=source)
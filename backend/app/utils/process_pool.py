@@ -0,0 +1,48 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class ProcessPool:
+    """Pool de processos para trabalho Python/NumPy que não paralelizaria
+    em threads (GIL).
+
+    Os processos nascem por ``forkserver`` (ou ``spawn``), nunca por
+    ``fork`` do servidor: o fork de um processo com várias threads pode
+    herdar locks presos (store, índice, métricas) e travar o filho. Dados
+    grandes vão por memória compartilhada (``app.utils.shared_arrays``); o
+    que é fixo durante a vida do processo vai em ``initargs``, uma vez por
+    processo."""
+
+    def __init__(self, max_workers: int, initializer=None, initargs=()):
+        methods = multiprocessing.get_all_start_methods()
+        self.max_workers = max_workers
+        self._context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=self._initializer,
+            initargs=self._initargs,
+        )
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Um processo morreu: as próximas chamadas usam um pool novo
+            if self._executor is executor:
+                self._executor = self._new_executor()
+            raise
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
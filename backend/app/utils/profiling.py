@@ -0,0 +1,196 @@
+import cProfile
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from app.config import Config
+
+
+class ProfileStore:
+    """Perfis recentes, por id (LRU limitado).
+
+    Uma requisição pode fazer várias chamadas perfiladas com o mesmo id
+    (por exemplo /accuracy: controller, sorteio e blocos); ``add`` soma as
+    estatísticas de todas (``pstats.Stats.add``) e guarda o maior pico de
+    memória, de modo que o relatório cobre a requisição inteira."""
+
+    def __init__(self, max_entries: int = Config.PROFILE_MAX_STORED):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reports: OrderedDict[str, dict] = OrderedDict()
+        self._stats: dict[str, pstats.Stats] = {}
+
+    def _put(self, profile_id: str, report: dict) -> None:
+        self._reports[profile_id] = report
+        while len(self._reports) > self.max_entries:
+            evicted, _ = self._reports.popitem(last=False)
+            self._stats.pop(evicted, None)
+
+    def add(
+        self,
+        profile_id: str,
+        route: str,
+        profiler: cProfile.Profile,
+        elapsed: float,
+        peak: int | None,
+        snapshot,
+    ) -> None:
+        """Incorpora uma chamada ao perfil ``profile_id``."""
+        with self._lock:
+            stats = self._stats.get(profile_id)
+            if stats is None:
+                stats = self._stats[profile_id] = pstats.Stats(profiler)
+                report = {
+                    "id": profile_id,
+                    "route": route,
+                    "n_calls": 0,
+                    "elapsed_s": 0.0,
+                    "peak_memory_kb": None,
+                    "allocations": None,
+                }
+            else:
+                stats.add(profiler)
+                report = dict(self._reports[profile_id])
+            report["n_calls"] += 1
+            report["elapsed_s"] += elapsed
+            # Alocações da chamada com o maior pico de memória
+            if peak is not None and peak / 1024 > (report["peak_memory_kb"] or -1):
+                report["peak_memory_kb"] = peak / 1024
+                report["allocations"] = _allocations(snapshot, Config.PROFILE_TOP_N)
+            report["calls"] = _call_tree(stats, Config.PROFILE_TOP_N)
+            self._put(profile_id, report)
+
+    def get(self, profile_id: str) -> dict | None:
+        with self._lock:
+            return self._reports.get(profile_id)
+
+    def ids(self) -> list[dict]:
+        with self._lock:
+            return [
+                {
+                    "id": pid,
+                    "route": r["route"],
+                    "n_calls": r["n_calls"],
+                    "elapsed_s": r["elapsed_s"],
+                }
+                for pid, r in self._reports.items()
+            ]
+
+
+PROFILES = ProfileStore()
+
+# (id, rota, perfil de memória?) do perfil pedido pela requisição corrente
+# (None = sem profiling). O CpuPool copia o contexto, então a thread que
+# faz o trabalho pesado o vê.
+_requested: ContextVar[tuple[str, str, bool] | None] = ContextVar(
+    "profile_requested", default=None
+)
+
+# tracemalloc é global ao processo e deixa mais lenta cada alocação de todas
+# as threads (inclusive do tráfego concorrente): só com pedido explícito e
+# um perfil de memória por vez
+_memory_lock = threading.Lock()
+
+
+def allowed(token: str | None) -> bool:
+    """Profiling só com ``PROFILE_TOKEN`` configurado e informado."""
+    return bool(Config.PROFILE_TOKEN) and token == Config.PROFILE_TOKEN
+
+
+def request_profile(route: str, memory: bool = False) -> str:
+    """Marca a requisição corrente para profiling (com ``memory``, também de
+    alocações) e retorna o id do perfil."""
+    profile_id = uuid.uuid4().hex
+    _requested.set((profile_id, route, memory))
+    return profile_id
+
+
+def active() -> bool:
+    return _requested.get() is not None
+
+
+def run(func, *args, **kwargs):
+    """Executa ``func``; se a requisição pediu profiling, com cProfile (só
+    nesta thread) e, se pedido também, tracemalloc, e soma a chamada ao
+    perfil da requisição em ``PROFILES``. Sem pedido o custo é uma leitura
+    de ``ContextVar``. Todo trabalho de rota fora do event loop passa por
+    aqui (``CpuPool`` e ``run_in_threadpool(profiling.run, ...)``)."""
+    requested = _requested.get()
+    if requested is None:
+        return func(*args, **kwargs)
+    profile_id, route, memory = requested
+
+    # Sem tracemalloc se outro perfil de memória (ou outro uso) está ativo
+    trace_memory = (
+        memory and not tracemalloc.is_tracing() and _memory_lock.acquire(blocking=False)
+    )
+    profiler = cProfile.Profile()
+    try:
+        if trace_memory:
+            tracemalloc.start(Config.PROFILE_TRACEMALLOC_FRAMES)
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot() if trace_memory else None
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            PROFILES.add(profile_id, route, profiler, elapsed, peak, snapshot)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+            _memory_lock.release()
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    return f"{filename}:{line}({name})" if line else name
+
+
+def _call_tree(stats: pstats.Stats, top_n: int) -> list[dict]:
+    """Funções com maior tempo cumulativo e, para cada uma, as chamadas
+    feitas por ela (filhas) com o tempo cumulativo dessas chamadas."""
+    stats = stats.stats
+    callees: dict[tuple, list] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, ncalls, _, cumtime) in callers.items():
+            callees.setdefault(caller, []).append((cumtime, ncalls, func))
+
+    top = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top_n]
+    tree = []
+    for func, (_, ncalls, tottime, cumtime, _) in top:
+        children = sorted(callees.get(func, []), key=lambda c: c[0], reverse=True)
+        tree.append(
+            {
+                "function": _label(func),
+                "ncalls": ncalls,
+                "tottime_s": tottime,
+                "cumtime_s": cumtime,
+                "callees": [
+                    {"function": _label(f), "ncalls": n, "cumtime_s": c}
+                    for c, n, f in children[:10]
+                ],
+            }
+        )
+    return tree
+
+
+def _allocations(snapshot, top_n: int) -> list[dict] | None:
+    """Linhas que mais alocaram (memória ainda viva no fim da chamada)."""
+    if snapshot is None:
+        return None
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    return [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": stat.size / 1024,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:top_n]
+    ]
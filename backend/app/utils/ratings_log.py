@@ -0,0 +1,218 @@
+import csv
+import os
+import threading
+
+from app.utils.logger import logger
+
+
+class _Batch:
+    """Linhas gravadas juntas (um write + fsync) e o resultado da gravação."""
+
+    __slots__ = ("rows", "done", "error")
+
+    def __init__(self):
+        self.rows: list[tuple[int, int, int]] = []
+        self.done = False
+        self.error: OSError | None = None
+
+
+class RatingsLog:
+    """Log append-only (write-ahead) de ratings com group commit.
+
+    Cada chamada a ``append`` coloca as linhas numa fila e bloqueia até que
+    estejam em disco. Uma thread escritora drena a fila inteira de uma vez, de
+    forma que requisições concorrentes compartilham um único ``fsync``. O custo
+    de uma escrita depende apenas do tamanho do lote, não do dataset.
+
+    Se a gravação de um lote falha (disco cheio, erro de fsync), quem espera
+    por ele recebe o ``OSError`` e a thread continua com os lotes seguintes;
+    o próximo lote começa numa linha nova, de modo que um resto parcial no
+    arquivo é descartado no replay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self._cond = threading.Condition()
+        # Serializa a escrita no arquivo com a rotação (que não espera a fila)
+        self._io_lock = threading.Lock()
+        self._batch = _Batch()
+        self._in_flight: _Batch | None = None
+        self._rows_in_log = 0
+        self._file = None
+        self._broken = False  # última escrita falhou: recomeçar em linha nova
+        self._writer = None
+        self._closed = False
+
+    # --- Recuperação ---
+
+    def replay(self) -> list[dict]:
+        """Lê as linhas ainda não compactadas (segmento em compactação + log atual).
+
+        Um segmento ``.compacting`` só sobra se o processo caiu no meio de uma
+        compactação; ele é reaplicado (semântica at-least-once)."""
+        rows = []
+        for path in (self.compacting_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for rec in csv.reader(f):
+                    # Última linha pode estar truncada se o processo caiu no write
+                    if len(rec) != 3:
+                        continue
+                    try:
+                        user_id, item_id, rating = (int(v) for v in rec)
+                    except ValueError:
+                        continue
+                    rows.append(
+                        {"user_id": user_id, "item_id": item_id, "rating": rating}
+                    )
+        self._rows_in_log = len(rows)
+        return rows
+
+    @property
+    def rows_in_log(self) -> int:
+        return self._rows_in_log
+
+    # --- Escrita ---
+
+    def enqueue(self, rows: list[dict]) -> _Batch:
+        """Coloca as linhas na fila de escrita e retorna o lote que deve ser
+        aguardado com ``wait_durable``."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RatingsLog já foi fechado")
+            self._ensure_writer()
+            self._batch.rows.extend(
+                (int(r["user_id"]), int(r["item_id"]), int(r["rating"])) for r in rows
+            )
+            self._cond.notify_all()
+            return self._batch
+
+    def wait_durable(self, batch: _Batch) -> None:
+        """Bloqueia até o lote estar em disco; ``OSError`` se a gravação falhou."""
+        with self._cond:
+            while not batch.done:
+                self._cond.wait()
+        if batch.error is not None:
+            raise OSError(
+                f"falha ao gravar o log de ratings: {batch.error}"
+            ) from batch.error
+
+    def append(self, rows: list[dict]) -> None:
+        self.wait_durable(self.enqueue(rows))
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(
+                target=self._run, name="ratings-log-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8", newline="")
+        return self._file
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._batch.rows and not self._closed:
+                    self._cond.wait()
+                if not self._batch.rows and self._closed:
+                    return
+                batch, self._batch = self._batch, _Batch()
+                self._in_flight = batch
+
+            # I/O fora do lock: novas requisições continuam enfileirando e
+            # entram no próximo lote.
+            error = None
+            with self._io_lock:
+                try:
+                    self._write(batch.rows)
+                except OSError as e:
+                    error = e
+                    logger.error(
+                        f"ratings log write failed rows={len(batch.rows)}: {e}"
+                    )
+                    self._discard_file()
+                else:
+                    with self._cond:
+                        self._rows_in_log += len(batch.rows)
+
+            with self._cond:
+                batch.error = error
+                batch.done = True
+                self._in_flight = None
+                self._cond.notify_all()
+
+    def _write(self, rows: list[tuple[int, int, int]]) -> None:
+        f = self._open()
+        prefix = "\n" if self._broken else ""
+        f.write(prefix + "".join(f"{u},{i},{r}\n" for u, i, r in rows))
+        f.flush()
+        os.fsync(f.fileno())
+        self._broken = False
+
+    def _discard_file(self) -> None:
+        """Depois de uma falha o buffer do arquivo pode guardar parte do lote:
+        o arquivo é reaberto na próxima escrita, começando em linha nova."""
+        self._broken = True
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def flush(self) -> None:
+        """Aguarda até que tudo o que já foi enfileirado esteja em disco."""
+        with self._cond:
+            batch = self._batch if self._batch.rows else self._in_flight
+        if batch is not None:
+            self.wait_durable(batch)
+
+    # --- Compactação ---
+
+    def rotate(self) -> str | None:
+        """Fecha o segmento atual e o renomeia para ``.compacting``.
+
+        Não espera a fila: lotes ainda não gravados vão para o segmento novo.
+        Como as linhas entram na memória antes de entrar no log, um snapshot
+        tirado depois da rotação contém tudo o que está no segmento
+        rotacionado (e talvez algumas linhas do novo, reaplicadas sem efeito
+        no replay, já que a última nota de cada par vale)."""
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._broken = False
+            if os.path.exists(self.path):
+                if os.path.exists(self.compacting_path):
+                    # Sobra de uma compactação interrompida: junta os segmentos
+                    with open(self.path, "r", encoding="utf-8") as src, open(
+                        self.compacting_path, "a", encoding="utf-8"
+                    ) as dst:
+                        dst.write(src.read())
+                    os.remove(self.path)
+                else:
+                    os.replace(self.path, self.compacting_path)
+            with self._cond:
+                self._rows_in_log = 0
+        if not os.path.exists(self.compacting_path):
+            return None
+        return self.compacting_path
+
+    def discard_rotated(self) -> None:
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        logger.info("ratings log closed")
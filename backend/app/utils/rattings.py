@@ -1,11 +1,22 @@
+import os
+
+import numpy as np
 import pandas as pd
 
 from app.config import Config
 
+# Layout compacto: ids em int32 e notas (1–5) em int8
+RATINGS_DTYPES = {"user_id": np.int32, "item_id": np.int32, "rating": np.int8}
+
 
 def load_ratings():
-    return pd.read_csv(Config.RATINGS_FILE)
+    return pd.read_csv(Config.RATINGS_FILE, dtype=RATINGS_DTYPES)
 
 
 def save_ratings(df):
-    df.to_csv(Config.RATINGS_FILE, index=False)
+    """Grava o snapshot base de forma atômica (arquivo temporário + rename)."""
+    tmp_path = Config.RATINGS_FILE + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, Config.RATINGS_FILE)
@@ -0,0 +1,42 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+_ALIGN = 64
+
+
+class SharedArrays:
+    """Arrays NumPy copiados uma vez para um segmento de memória
+    compartilhada; outros processos os anexam pelo nome (``attach``) sem
+    copiar nada. Quem cria o segmento o remove com ``close``."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        layout, size = {}, 0
+        for name, array in arrays.items():
+            layout[name] = (size, array.dtype.str, array.shape)
+            size += -(-array.nbytes // _ALIGN) * _ALIGN
+        self._shm = SharedMemory(create=True, size=max(size, 1))
+        for name, array in arrays.items():
+            offset, dtype, shape = layout[name]
+            view = np.ndarray(shape, dtype, buffer=self._shm.buf, offset=offset)
+            view[...] = array
+            del view
+        # (nome do segmento, layout): o que um processo precisa para anexar
+        self.spec = (self._shm.name, layout)
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+
+def attach(spec) -> tuple[SharedMemory, dict[str, np.ndarray]]:
+    """Anexa os arrays de ``SharedArrays.spec`` (somente leitura). O
+    segmento deve ser fechado (``close``) depois que os arrays saírem de uso."""
+    name, layout = spec
+    shm = SharedMemory(name=name)
+    arrays = {}
+    for key, (offset, dtype, shape) in layout.items():
+        array = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[key] = array
+    return shm, arrays
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from app.utils.rattings import RATINGS_DTYPES
+
+# Parâmetros do modelo gerador
+ITEM_POPULARITY_EXPONENT = 0.9  # popularidade dos itens ~ rank^-expoente
+USER_ACTIVITY_SIGMA = 1.0  # atividade dos usuários: log-normal (cauda longa)
+FAVORITE_GENRES = 2  # gêneros preferidos por usuário
+GENRE_AFFINITY = 0.7  # fração dos ratings dentro dos gêneros preferidos
+BASE_RATING = 3.3
+AFFINITY_BONUS = 0.7  # itens dos gêneros preferidos recebem notas maiores
+USER_BIAS_STD = 0.5
+ITEM_QUALITY_STD = 0.5
+NOISE_STD = 0.9
+MAX_RESAMPLE_ROUNDS = 10  # rodadas para repor pares (usuário, item) repetidos
+
+
+class _ItemSampler:
+    """Amostragem vetorizada de itens do catálogo, global ou por gênero.
+
+    A popularidade segue uma lei de potência sobre uma permutação aleatória
+    dos itens. Os itens ficam ordenados por gênero e a CDF de cada gênero é
+    deslocada para ``[g, g + 1)``: sortear no gênero ``g`` é um único
+    ``searchsorted`` com ``g + u``, para qualquer vetor de gêneros."""
+
+    def __init__(self, items: pd.DataFrame, rng: np.random.Generator):
+        genre_codes, self.genres = pd.factorize(items["genre"])
+        order = np.argsort(genre_codes, kind="stable")
+        self.item_ids = items["id"].to_numpy(dtype=np.int64)[order]
+        self.genre_of = genre_codes[order]
+        self.quality = rng.normal(0.0, ITEM_QUALITY_STD, len(order))
+
+        ranks = rng.permutation(len(order)) + 1
+        popularity = ranks ** -float(ITEM_POPULARITY_EXPONENT)
+        self.global_cdf = np.cumsum(popularity)
+        self.global_cdf /= self.global_cdf[-1]
+
+        genre_totals = np.bincount(self.genre_of, weights=popularity)
+        within = np.cumsum(popularity) - np.repeat(
+            np.cumsum(genre_totals) - genre_totals, np.bincount(self.genre_of)
+        )
+        self.genre_cdf = self.genre_of + within / genre_totals[self.genre_of]
+        self.genre_share = genre_totals / genre_totals.sum()
+
+    def sample_global(self, rng, size: int) -> np.ndarray:
+        pos = np.searchsorted(self.global_cdf, rng.random(size), side="right")
+        return np.minimum(pos, len(self.item_ids) - 1)
+
+    def sample_in_genres(self, rng, genres: np.ndarray) -> np.ndarray:
+        pos = np.searchsorted(
+            self.genre_cdf, genres + rng.random(len(genres)), side="right"
+        )
+        return np.minimum(pos, len(self.item_ids) - 1)
+
+
+def _user_counts(n_ratings, n_users, min_per_user, max_per_user, rng) -> np.ndarray:
+    """Número de ratings por usuário: mínimo garantido + multinomial sobre
+    pesos log-normais (poucos usuários muito ativos, muitos pouco ativos)."""
+    activity = rng.lognormal(0.0, USER_ACTIVITY_SIGMA, n_users)
+    extra = max(0, n_ratings - min_per_user * n_users)
+    counts = min_per_user + rng.multinomial(extra, activity / activity.sum())
+    return np.minimum(counts, max_per_user)
+
+
+def generate_ratings(
+    items: pd.DataFrame,
+    n_ratings: int,
+    n_users: int,
+    start_user_id: int = 1,
+    min_per_user: int = 1,
+    chunk_rows: int = 1_000_000,
+    seed: int = 42,
+):
+    """Gera ratings sintéticos em blocos de até ~``chunk_rows`` linhas.
+
+    Usa os ids reais do catálogo, popularidade em lei de potência,
+    atividade de usuários com cauda longa e afinidade por gênero (cada
+    usuário tem gêneros preferidos, onde avalia mais e dá notas maiores).
+    Cada bloco contém usuários inteiros e não repete (usuário, item), então
+    a memória fica limitada ao bloco mais O(usuários) para as contagens.
+    Reprodutível pela ``seed``."""
+    rng = np.random.default_rng(seed)
+    sampler = _ItemSampler(items, rng)
+    counts = _user_counts(n_ratings, n_users, min_per_user, len(sampler.item_ids), rng)
+    ends = np.cumsum(counts)
+
+    first = 0
+    chunk = 0
+    while first < n_users:
+        # Último usuário cujo total acumulado cabe no bloco (ao menos um)
+        base = ends[first - 1] if first else 0
+        last = int(np.searchsorted(ends, base + chunk_rows, side="right"))
+        last = max(last, first + 1)
+        yield _generate_chunk(
+            sampler,
+            counts[first:last],
+            start_user_id + first,
+            np.random.default_rng([seed, chunk]),
+        )
+        first = last
+        chunk += 1
+
+
+def _generate_chunk(sampler: _ItemSampler, counts, first_user_id, rng):
+    n_users = len(counts)
+    user_bias = rng.normal(0.0, USER_BIAS_STD, n_users)
+    favorites = rng.choice(
+        len(sampler.genre_share),
+        size=(n_users, FAVORITE_GENRES),
+        p=sampler.genre_share,
+    )
+
+    # Sorteia e remove (usuário, item) repetidos; quem ficou abaixo da sua
+    # contagem recebe novos sorteios, por um número limitado de rodadas
+    n_items = len(sampler.item_ids)
+    keys = np.empty(0, dtype=np.int64)
+    missing = counts
+    for _ in range(MAX_RESAMPLE_ROUNDS):
+        local_user = np.repeat(np.arange(n_users), missing)
+        if not len(local_user):
+            break
+        affine = rng.random(len(local_user)) < GENRE_AFFINITY
+        pos = sampler.sample_global(rng, len(local_user))
+        picks = favorites[
+            local_user[affine], rng.integers(FAVORITE_GENRES, size=affine.sum())
+        ]
+        pos[affine] = sampler.sample_in_genres(rng, picks)
+        keys = np.concatenate([keys, local_user * n_items + pos])
+        keys.sort()
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+        missing = counts - np.bincount(keys // n_items, minlength=n_users)
+    local_user, pos = keys // n_items, keys % n_items
+
+    is_favorite = (favorites[local_user] == sampler.genre_of[pos][:, None]).any(axis=1)
+    score = (
+        BASE_RATING
+        + user_bias[local_user]
+        + sampler.quality[pos]
+        + AFFINITY_BONUS * is_favorite
+        + rng.normal(0.0, NOISE_STD, len(pos))
+    )
+    return pd.DataFrame(
+        {
+            "user_id": local_user + first_user_id,
+            "item_id": sampler.item_ids[pos],
+            "rating": np.clip(np.rint(score), 1, 5),
+        }
+    ).astype(RATINGS_DTYPES)
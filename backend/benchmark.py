@@ -0,0 +1,305 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+
+# --- Configurações do Script ---
+# Escalas no formato <ratings>:<usuários>
+SCALES = ["10k:1k", "100k:10k", "1M:100k", "10M:1M"]
+METRICS = ["cossin", "pearson", "item_cosine"]
+SUFFIXES = {"k": 10**3, "M": 10**6}
+
+
+def parse_count(text: str) -> int:
+    if text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def parse_scale(scale: str) -> tuple[int, int]:
+    n_ratings, n_users = scale.split(":")
+    return parse_count(n_ratings), parse_count(n_users)
+
+
+def percentiles(seconds: list[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def cache_counts(responses) -> dict:
+    """Respostas por valor do header ``X-Cache`` (HIT/MISS/BYPASS)."""
+    counts = {}
+    for response in responses:
+        status = response.headers.get("X-Cache")
+        if status is not None:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def timed_requests(send, sequential, concurrent, concurrency: int) -> dict:
+    """Latência sequencial e vazão (sequencial e concorrente) de ``send``.
+
+    As duas fases recebem payloads diferentes, para que a concorrente não
+    repita (e encontre em cache) o que a sequencial já pediu. Latências são
+    separadas por ``X-Cache`` e cada fase informa quantos HIT/MISS teve."""
+    latencies = {}
+    responses = []
+    start = time.perf_counter()
+    for payload in sequential:
+        t = time.perf_counter()
+        response = send(payload)
+        elapsed = time.perf_counter() - t
+        latencies.setdefault(response.headers.get("X-Cache", "all"), []).append(elapsed)
+        responses.append(response)
+    sequential_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        concurrent_responses = list(pool.map(send, concurrent))
+    concurrent_s = time.perf_counter() - start
+    return {
+        **percentiles([t for ts in latencies.values() for t in ts]),
+        "latency_by_cache": {
+            status: percentiles(ts)
+            for status, ts in latencies.items()
+            if status != "all"
+        },
+        "throughput_rps": len(sequential) / sequential_s,
+        f"throughput_rps_concurrency_{concurrency}": len(concurrent) / concurrent_s,
+        "cache": cache_counts(responses),
+        "cache_concurrent": cache_counts(concurrent_responses),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss é em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scale(scale: str, args, out_path: str) -> None:
+    """Executa uma escala (em processo próprio, para medir o pico de RSS).
+
+    Arquivos gravados pelo backend (inclusive o snapshot de ratings da
+    compactação no encerramento) vão para um diretório temporário, removido
+    no fim."""
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp_dir:
+        _run_scale(scale, args, out_path, tmp_dir)
+
+
+def _run_scale(scale: str, args, out_path: str, tmp_dir: str) -> None:
+    from fastapi.testclient import TestClient
+
+    from app import create_app
+    from app.services.data_store import DataStore
+    from app.utils import load_items
+    from app.utils.ratings_log import RatingsLog
+    from app.utils.synthetic import generate_ratings
+
+    logging.disable(logging.INFO)
+    n_ratings, n_users = parse_scale(scale)
+    result = {"scale": scale, "users": n_users, "stages": {}}
+
+    def checkpoint():
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+
+    Config.RATINGS_FILE = os.path.join(tmp_dir, "ratings.csv")
+    Config.RATINGS_LOG_FILE = os.path.join(tmp_dir, "ratings.log")
+    Config.GENRE_WEIGHTS_FILE = os.path.join(tmp_dir, "genre_weights.json")
+    Config.NEIGHBORS_FILE = os.path.join(tmp_dir, "neighbors_{metric}.npz")
+    Config.ITEM_SIMILARITY_FILE = os.path.join(tmp_dir, "item_similarity_{metric}.npz")
+
+    items = load_items()
+    start = time.perf_counter()
+    ratings = pd.concat(
+        generate_ratings(items, n_ratings, n_users, seed=args.seed), ignore_index=True
+    )
+    result["stages"]["generate_s"] = time.perf_counter() - start
+    result["ratings"] = len(ratings)
+    checkpoint()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = DataStore(
+        items=items,
+        ratings=ratings,
+        genre_weights={},
+        ratings_log=RatingsLog(Config.RATINGS_LOG_FILE),
+    )
+    store.index().matrix()
+    result["stages"]["index_build_s"] = time.perf_counter() - start
+    result["stages"]["index_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    checkpoint()
+
+    # Grafo de vizinhos e tabelas item-item só até o limite de usuários
+    built = set()
+    for metric in args.metrics:
+        if n_users > args.max_precompute_users:
+            result["stages"][f"precompute_{metric}"] = "skipped"
+            continue
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if metric in ("cossin", "pearson"):
+            store.neighbor_graph(metric)
+        else:
+            store.item_similarity(metric)
+        result["stages"][f"precompute_{metric}_s"] = time.perf_counter() - start
+        result["stages"][f"precompute_{metric}_peak_mb"] = (
+            tracemalloc.get_traced_memory()[1] / 2**20
+        )
+        built.add(metric)
+        checkpoint()
+    tracemalloc.stop()
+    if n_users > args.max_precompute_users:
+        Config.NEIGHBORS_K = 0  # sem grafo: similaridade calculada por requisição
+
+    rng = np.random.default_rng(args.seed)
+    user_ids = store.user_ids()
+    with TestClient(create_app(store)) as client:
+        for metric in args.metrics:
+            if metric not in built and metric not in ("cossin", "pearson"):
+                result["stages"][f"recomendar_{metric}"] = "skipped"
+                continue
+            # Usuários distintos e fases disjuntas: a rodada fria mede só
+            # cálculo (MISS); repetir os mesmos usuários mede o cache (HIT)
+            size = min(2 * args.requests, len(user_ids))
+            users = rng.choice(user_ids, size=size, replace=False).tolist()
+            first, second = users[: size // 2], users[size // 2 :]
+
+            def send(u, m=metric):
+                response = client.get(
+                    "/recomendar", params={"user_id": u, "n": 10, "metric": m}
+                )
+                return response.raise_for_status()
+
+            result["stages"][f"recomendar_{metric}"] = timed_requests(
+                send, first, second, args.concurrency
+            )
+            checkpoint()
+            result["stages"][f"recomendar_{metric}_cached"] = timed_requests(
+                send, first, second, args.concurrency
+            )
+            checkpoint()
+
+        feedbacks = [
+            {
+                "user_id": int(rng.choice(user_ids)),
+                "item_id": int(rng.choice(items.id.to_numpy())),
+                "rating": int(rng.integers(1, 6)),
+            }
+            for _ in range(2 * args.requests)
+        ]
+        result["stages"]["feedback"] = timed_requests(
+            lambda fb: client.post("/feedback", json=fb).raise_for_status(),
+            feedbacks[: args.requests],
+            feedbacks[args.requests :],
+            args.concurrency,
+        )
+    result["peak_rss_mb"] = peak_rss_mb()
+    checkpoint()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Config.DATA_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(args):
+    """
+    Benchmark de escala: gera ratings sintéticos em várias escalas e mede
+    tempo de construção do índice e do pré-cálculo (grafo / tabela
+    item-item), pico de memória, latência (p50/p90/p99) e vazão de
+    /recomendar e /feedback. /recomendar é medido sem cache (usuários
+    distintos, fases sequencial e concorrente disjuntas) e com cache
+    (``recomendar_<métrica>_cached``, os mesmos usuários de novo). Cada
+    escala roda em um processo separado, com limite de tempo; o relatório
+    JSON guarda o que foi medido até o limite.
+    """
+    report = {
+        "commit": git_commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "metrics": args.metrics,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "max_precompute_users": args.max_precompute_users,
+            "timeout_s": args.timeout,
+            "seed": args.seed,
+        },
+        "scales": [],
+    }
+    for scale in args.scales:
+        fd, out_path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        cmd = [sys.executable, os.path.abspath(__file__), "--run-scale", scale]
+        cmd += ["--scale-output", out_path, "--seed", str(args.seed)]
+        cmd += ["--requests", str(args.requests)]
+        cmd += ["--concurrency", str(args.concurrency)]
+        cmd += ["--max-precompute-users", str(args.max_precompute_users)]
+        cmd += ["--metrics", *args.metrics]
+        print(f"Escala {scale}...", flush=True)
+        try:
+            proc = subprocess.run(cmd, cwd=Config.DATA_DIR, timeout=args.timeout)
+            status = "ok" if proc.returncode == 0 else f"exit {proc.returncode}"
+        except subprocess.TimeoutExpired:
+            status = "timeout"
+        with open(out_path, encoding="utf-8") as f:
+            text = f.read()
+        os.remove(out_path)
+        result = json.loads(text) if text else {"scale": scale}
+        result["status"] = status
+        report["scales"].append(result)
+        print(json.dumps(result, indent=2))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Relatório salvo em '{args.output}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=benchmark.__doc__)
+    parser.add_argument("--scales", nargs="+", default=SCALES)
+    parser.add_argument("--metrics", nargs="+", default=METRICS)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-precompute-users", type=int, default=20_000)
+    parser.add_argument("--timeout", type=float, default=1800, help="por escala")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    parser.add_argument("--scale-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_scale:
+        run_scale(args.run_scale, args, args.scale_output)
+    else:
+        benchmark(args)
@@ -0,0 +1,36 @@
+import argparse
+
+from app.config import Config
+from app.services.data_store import DataStore
+from app.services.item_similarity import ItemSimilarityTable
+from app.services.prediction_service import ITEM_METRICS
+
+
+def build_item_similarities(k: int, block_bytes: int):
+    """
+    Gera offline a tabela top-k de itens similares de cada métrica item-item
+    e salva em item_similarity_<metrica>.npz. Na inicialização o backend usa
+    esses arquivos quando eles correspondem aos ratings atuais; caso
+    contrário reconstrói.
+    """
+    store = DataStore.load()
+    index = store.index()
+    matrix = index.matrix()
+    print(
+        f"Usuários: {matrix.n_users} | Itens: {matrix.n_items} | Ratings: {len(matrix.data)}"
+    )
+
+    for metric in ITEM_METRICS:
+        table = ItemSimilarityTable.build(matrix, metric, k=k, block_bytes=block_bytes)
+        table.fingerprint = index.fingerprint()
+        path = Config.ITEM_SIMILARITY_FILE.format(metric=metric)
+        table.save(path)
+        print(f"Tabela '{metric}' (k={table.k}) salva em '{path}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=build_item_similarities.__doc__)
+    parser.add_argument("--k", type=int, default=Config.ITEM_NEIGHBORS_K)
+    parser.add_argument("--block-bytes", type=int, default=Config.NEIGHBOR_BLOCK_BYTES)
+    args = parser.parse_args()
+    build_item_similarities(k=args.k, block_bytes=args.block_bytes)
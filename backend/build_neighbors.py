@@ -0,0 +1,37 @@
+import argparse
+
+from app.config import Config
+from app.services.data_store import DataStore
+from app.services.neighbor_graph import NeighborGraph
+
+# --- Configurações do Script ---
+METRICS = ["cossin", "pearson"]
+
+
+def build_neighbor_graphs(k: int, block_bytes: int):
+    """
+    Gera offline o grafo top-k de vizinhos de cada métrica e salva em
+    neighbors_<metrica>.npz. Na inicialização o backend usa esses arquivos
+    quando eles correspondem aos ratings atuais; caso contrário reconstrói.
+    """
+    store = DataStore.load()
+    index = store.index()
+    matrix = index.matrix()
+    print(
+        f"Usuários: {matrix.n_users} | Itens: {matrix.n_items} | Ratings: {len(matrix.data)}"
+    )
+
+    for metric in METRICS:
+        graph = NeighborGraph.build(matrix, metric, k=k, block_bytes=block_bytes)
+        graph.fingerprint = index.fingerprint()
+        path = Config.NEIGHBORS_FILE.format(metric=metric)
+        graph.save(path)
+        print(f"Grafo '{metric}' (k={k}) salvo em '{path}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=build_neighbor_graphs.__doc__)
+    parser.add_argument("--k", type=int, default=Config.NEIGHBORS_K)
+    parser.add_argument("--block-bytes", type=int, default=Config.NEIGHBOR_BLOCK_BYTES)
+    args = parser.parse_args()
+    build_neighbor_graphs(k=args.k, block_bytes=args.block_bytes)
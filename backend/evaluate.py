@@ -0,0 +1,179 @@
+import argparse
+import json
+import subprocess
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.services.data_store import DataStore
+from app.services.prediction_service import ITEM_METRICS, USER_METRICS
+from app.services.rating_index import RatingIndex
+from app.services.recommendation_service import RecommendationService
+
+# --- Configurações do Script ---
+METRICS = [*USER_METRICS, *ITEM_METRICS]
+LIKED_THRESHOLD = 4  # notas >= 4 são os itens relevantes (retidos para teste)
+
+
+def make_splits(index: RatingIndex, users, scheme: str, k: int, folds: int, seed):
+    """Gera (fold, user_id, itens retidos) de forma reprodutível.
+
+    - ``leave-k-out``: retém ``k`` itens curtidos de cada usuário que tenha
+      mais de ``k`` ratings;
+    - ``kfold``: distribui os itens curtidos de cada usuário em ``folds``
+      partes e retém uma parte por vez."""
+    for user_id in users:
+        rng = np.random.default_rng([seed, user_id])
+        item_ids, values = index.user_ratings(user_id)
+        liked = item_ids[values >= LIKED_THRESHOLD]
+        if scheme == "leave-k-out":
+            if len(liked) == 0 or len(item_ids) <= k:
+                continue
+            yield 0, user_id, rng.choice(liked, size=min(k, len(liked)), replace=False)
+        else:
+            assignment = rng.permutation(len(liked)) % folds
+            for fold in range(folds):
+                held_out = liked[assignment == fold]
+                if len(held_out):
+                    yield fold, user_id, held_out
+
+
+def ranking_metrics(recommended: list[int], relevant: set[int], k: int) -> dict:
+    hits = np.array([item_id in relevant for item_id in recommended[:k]], dtype=float)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = discounts[: min(len(relevant), k)].sum()
+    return {
+        "precision": hits.sum() / k,
+        "recall": hits.sum() / len(relevant),
+        "ndcg": float((hits * discounts[: len(hits)]).sum() / ideal) if ideal else 0.0,
+    }
+
+
+def evaluate_metric(store: DataStore, index: RatingIndex, splits, metric: str, k: int):
+    service = RecommendationService(metric)
+    catalog = store.catalog()
+    genre_pools = store.genre_pools()
+    genre_weights = store.genre_weights_by_user()
+    default_genre_weights = store.default_genre_weights()
+    per_user, latencies, recommended_items = [], [], set()
+
+    for fold, user_id, held_out in splits:
+        train = index.masked(user_id, held_out)
+        start = time.perf_counter()
+        recs = service.recommend_items(
+            user_id,
+            n=k,
+            index=train,
+            catalog=catalog,
+            genre_weights=genre_weights.get(user_id, default_genre_weights),
+            genre_pools=genre_pools,
+            random_state=int(user_id) + fold,
+        )
+        latencies.append(time.perf_counter() - start)
+        rec_ids = [r["item_id"] for r in recs]
+        recommended_items.update(rec_ids)
+        per_user.append(ranking_metrics(rec_ids, set(held_out.tolist()), k))
+
+    if not per_user:
+        return {"n_evaluations": 0}
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "n_evaluations": len(per_user),
+        f"precision@{k}": float(np.mean([m["precision"] for m in per_user])),
+        f"recall@{k}": float(np.mean([m["recall"] for m in per_user])),
+        f"ndcg@{k}": float(np.mean([m["ndcg"] for m in per_user])),
+        "coverage": len(recommended_items) / len(catalog),
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p90": float(np.percentile(latencies_ms, 90)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+        },
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Config.DATA_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def evaluate(metrics, scheme, k, holdout, folds, max_users, seed, output):
+    """
+    Avaliação offline sobre os arquivos de ratings: precision@k, recall@k,
+    NDCG@k, cobertura do catálogo e latência por usuário (p50/p90/p99) para
+    cada métrica, com divisão leave-k-out ou k-fold reprodutível pela seed.
+    O resultado é gravado em JSON para comparar execuções entre commits.
+    """
+    store = DataStore.load()
+    index = store.index().snapshot()
+    users = index.user_ids()
+    if max_users and len(users) > max_users:
+        rng = np.random.default_rng(seed)
+        users = sorted(rng.choice(users, size=max_users, replace=False).tolist())
+    splits = list(make_splits(index, users, scheme, holdout, folds, seed))
+    print(
+        f"Usuários: {len(users)} | Avaliações: {len(splits)} | Ratings: {index.n_ratings}"
+    )
+
+    results = {}
+    for metric in metrics:
+        start = time.time()
+        results[metric] = evaluate_metric(store, index, splits, metric, k)
+        print(f"{metric}: {json.dumps(results[metric])} ({time.time() - start:.1f}s)")
+
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "scheme": scheme,
+            "k": k,
+            "holdout": holdout,
+            "folds": folds,
+            "max_users": max_users,
+            "seed": seed,
+            "neighbors_k": Config.NEIGHBORS_K,
+            "item_neighbors_k": Config.ITEM_NEIGHBORS_K,
+        },
+        "dataset": {
+            "users": len(index.user_ids()),
+            "items": len(store.items()),
+            "ratings": index.n_ratings,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em '{output}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=evaluate.__doc__)
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=METRICS)
+    parser.add_argument(
+        "--scheme", choices=["leave-k-out", "kfold"], default="leave-k-out"
+    )
+    parser.add_argument("--k", type=int, default=10, help="tamanho da lista (@k)")
+    parser.add_argument("--holdout", type=int, default=1, help="itens retidos")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--max-users", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="eval_results.json")
+    args = parser.parse_args()
+    evaluate(
+        metrics=args.metrics,
+        scheme=args.scheme,
+        k=args.k,
+        holdout=args.holdout,
+        folds=args.folds,
+        max_users=args.max_users,
+        seed=args.seed,
+        output=args.output,
+    )
@@ -0,0 +1,74 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from app.utils import load_items
+from app.utils.rattings import RATINGS_DTYPES
+from app.utils.synthetic import generate_ratings
+
+
+def generate(n_ratings, n_users, output, append, min_per_user, chunk_rows, seed):
+    """
+    Gera um arquivo de ratings sintéticos para o catálogo real (ids de
+    new_items.csv), com popularidade em lei de potência e afinidade por
+    gênero. A saída é escrita em blocos, com memória limitada ao bloco.
+    Com --append, o conteúdo de --output é mantido e os novos usuários
+    recebem ids após o maior existente.
+    """
+    start_user_id = 1
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        header = True
+        if append and os.path.exists(output):
+            for chunk in pd.read_csv(
+                output, dtype=RATINGS_DTYPES, chunksize=chunk_rows
+            ):
+                start_user_id = max(start_user_id, int(chunk.user_id.max()) + 1)
+                chunk.to_csv(f, header=header, index=False)
+                header = False
+
+        start = time.time()
+        total = 0
+        for chunk in generate_ratings(
+            load_items(),
+            n_ratings,
+            n_users,
+            start_user_id=start_user_id,
+            min_per_user=min_per_user,
+            chunk_rows=chunk_rows,
+            seed=seed,
+        ):
+            chunk.to_csv(f, header=header, index=False)
+            header = False
+            total += len(chunk)
+            print(f"{total} ratings ({time.time() - start:.1f}s)", flush=True)
+    os.replace(tmp_path, output)
+
+    print("---")
+    print(
+        f"Ratings gerados: {total} | Usuários: {n_users} (a partir do id {start_user_id})"
+    )
+    print(f"Arquivo salvo em '{output}' ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=generate.__doc__)
+    parser.add_argument("--ratings", type=int, required=True)
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--append", action="store_true")
+    parser.add_argument("--min-per-user", type=int, default=1)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(
+        n_ratings=args.ratings,
+        n_users=args.users,
+        output=args.output,
+        append=args.append,
+        min_per_user=args.min_per_user,
+        chunk_rows=args.chunk_rows,
+        seed=args.seed,
+    )
@@ -65,6 +65,24 @@ class AppService:
             st.error(f"Erro ao buscar recomendações: {e}")
             return []
 
+    def send_feedback_batch(self, user_id, feedback_queue):
+        """Envia todas as notas da fila em uma única chamada."""
+        feedbacks = [
+            {"user_id": user_id, "item_id": item_id, "rating": rating_value}
+            for item_id, rating_value in feedback_queue.items()
+        ]
+        try:
+            response = requests.post(
+                f"{self.base_url}/feedback/batch",
+                json={"feedbacks": feedbacks},
+                timeout=60,
+            )
+            response.raise_for_status()
+            return len(feedbacks)
+        except requests.exceptions.RequestException as e:
+            st.error(f"Erro ao enviar avaliações: {e}")
+            return 0
+
     def send_feedback_star(self, user_id, item_id, rating_value):
         """Envia a nota de 1 a 5 para o backend."""
         try:
@@ -92,11 +110,10 @@ class AppService:
             st.warning("Nenhum feedback pendente.")
             return
 
-        success_count = 0
         with st.spinner("Processando avaliações e recalculando..."):
-            for item_id, rating_value in st.session_state.feedback_queue.items():
-                if self.send_feedback_star(user_id, item_id, rating_value):
-                    success_count += 1
+            success_count = self.send_feedback_batch(
+                user_id, st.session_state.feedback_queue
+            )
 
             st.session_state.feedback_queue = {}
             st.session_state.recommendations = self.fetch_recommendations(
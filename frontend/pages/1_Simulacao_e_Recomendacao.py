@@ -95,6 +95,8 @@ st.sidebar.header("⚙️ Configurações do Algoritmo")
 metric_options = {
     "Similaridade de Cossenos": "cosine",
     "Correlação de Pearson": "pearson",
+    "Item-Item (Cossenos)": "item_cosine",
+    "Item-Item (Cossenos Ajustado)": "item_adjusted_cosine",
 }
 selected_metric_name = st.sidebar.selectbox(
     "Métrica de Similaridade:", options=list(metric_options.keys()), index=0
@@ -101,7 +101,12 @@ def convert(obj):
 # ---------------------------
 # Opções de entrada
 # ---------------------------
-metric_options = {"Cossenos": "cosine", "Pearson": "pearson"}
+metric_options = {
+    "Cossenos": "cosine",
+    "Pearson": "pearson",
+    "Item-Item (Cossenos)": "item_cosine",
+    "Item-Item (Cossenos Ajustado)": "item_adjusted_cosine",
+}
 selected_metric_name = st.selectbox(
     "Escolha a Métrica de Similaridade:",
     options=list(metric_options.keys()),